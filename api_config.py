@@ -1,4 +1,3 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 
@@ -11,6 +10,9 @@ def configure_gemini():
     if not api_key or api_key == "your_actual_gemini_api_key_here":
         raise ValueError("❌ Please set your GEMINI_API_KEY in .env file")
     
+    # Imported here so importing this module (and the app) does not pull in the SDK and grpc
+    import google.generativeai as genai
+    
     genai.configure(api_key=api_key)
     
     # Try gemini-2.5-flash, fallback to 1.5-flash
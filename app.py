@@ -1,7 +1,14 @@
 import streamlit as st
+import os
 import time
-from retrieval_system import rag_system
-from api_config import configure_gemini
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from showcase import SHOWCASE_PROMPTS
+from status_server import start_status_server
+from warmup import start_backend, readiness_status
+from async_pipeline import QueryRunner
+from session_context import ConversationSession
+from profiling import profile_request
+from instrumentation import inc, start_metrics_file_exporter
 
 # Page configuration
 st.set_page_config(
@@ -11,474 +18,21 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Enhanced safety check function
-def check_query_safety(query):
-    """Check if query requests inappropriate information"""
-    query_lower = query.lower().strip()
-    
-    if not query_lower:
-        return True, 'safe', None
-    
-    # PII patterns - more comprehensive with word boundaries
-    pii_keywords = {
-        'contact': ['contact information', 'contact details', 'phone number', 'mobile number', 
-                   'telephone', 'email address', 'email id', 'address'],
-        'identity': ['full name', 'patient name', 'first name', 'last name', 'name of patient',
-                    'patient\'s name', 'names', 'patient identifier'],
-        'personal': ['social security', 'ssn', 'date of birth', 'dob', 'birth date',
-                    'patient id', 'medical record number', 'mrn', 'patient number',
-                    'insurance id', 'policy number', 'medicare number', 'medicaid number'],
-        'location': ['home address', 'street address', 'zip code', 'residence', 'city',
-                    'state', 'postal code', 'apartment number', 'house number']
-    }
-    
-    # Check for exact phrase matches first
-    for category, keywords in pii_keywords.items():
-        for keyword in keywords:
-            if keyword in query_lower:
-                # Additional check to avoid false positives
-                words = query_lower.split()
-                if any(keyword in " ".join(words[i:i+len(keyword.split())]) 
-                      for i in range(len(words) - len(keyword.split()) + 1)):
-                    return False, 'pii_request', category
-    
-    # Personal medical advice patterns
-    personal_patterns = [
-        'i have', 'my symptoms', 'should i take', 'what should i do', 'am i',
-        'my diagnosis', 'i feel', 'i am experiencing', 'i need advice',
-        'can i take', 'is it safe for me', 'do i have', 'my condition',
-        'personal advice', 'about myself', 'my medical', 'my treatment'
-    ]
-    
-    for pattern in personal_patterns:
-        if pattern in query_lower:
-            # Check if it's a general query vs personal
-            if any(word in query_lower for word in ['patient', 'patients', 'generally', 'typically', 'usually']):
-                continue
-            return False, 'personal_advice', None
-    
-    # Suspicious query patterns
-    suspicious_patterns = [
-        'password', 'login', 'credentials', 'username',
-        'credit card', 'bank account', 'financial information',
-        'delete', 'modify', 'change record', 'alter data',
-        'confidential', 'secret', 'restricted access'
-    ]
-    
-    for pattern in suspicious_patterns:
-        if pattern in query_lower:
-            return False, 'suspicious_query', None
-    
-    return True, 'safe', None
-
-# Professional CSS styling with FIXED CONTRAST
-st.markdown("""
-<style>
-    /* Main layout */
-    .stApp {
-        background: linear-gradient(135deg, #f0f4f8 0%, #d9e2ec 100%);
-    }
-    
-    .main-container {
-        background: white;
-        border-radius: 20px;
-        padding: 40px;
-        margin: 20px auto;
-        max-width: 1400px;
-        box-shadow: 0 20px 60px rgba(0,0,0,0.1);
-        border: 1px solid #e2e8f0;
-    }
-    
-    /* Typography - MAXIMUM CONTRAST */
-    .hero-title {
-        font-size: 3.5rem;
-        font-weight: 900;
-        color: #1a202c !important;
-        text-align: center;
-        margin-bottom: 10px;
-        letter-spacing: -1px;
-    }
-    
-    .hero-subtitle {
-        text-align: center;
-        color: #2d3748 !important;
-        font-size: 1.3rem;
-        margin-bottom: 30px;
-        font-weight: 500;
-    }
-    
-    .section-header {
-        font-size: 1.8rem;
-        color: #1a202c !important;
-        font-weight: 700;
-        margin: 30px 0 20px 0;
-        padding-bottom: 10px;
-        border-bottom: 3px solid #4299e1;
-    }
-    
-    /* Warning/Error messages - HIGH CONTRAST */
-    .warning-box {
-        background: #fff5f5;
-        border-left: 6px solid #c53030;
-        padding: 25px;
-        border-radius: 12px;
-        margin: 20px 0;
-        color: #742a2a !important;
-        box-shadow: 0 4px 12px rgba(197, 48, 48, 0.15);
-        border: 1px solid #fc8181;
-    }
-    
-    .warning-title {
-        font-size: 1.4rem;
-        font-weight: 700;
-        margin-bottom: 10px;
-        color: #742a2a !important;
-    }
-    
-    .warning-box p {
-        color: #742a2a !important;
-        font-weight: 500;
-    }
-    
-    .info-box {
-        background: #ebf8ff;
-        border-left: 6px solid #3182ce;
-        padding: 25px;
-        border-radius: 12px;
-        margin: 20px 0;
-        color: #2c5282 !important;
-        box-shadow: 0 4px 12px rgba(49, 130, 206, 0.15);
-        border: 1px solid #90cdf4;
-    }
-    
-    .info-title {
-        font-size: 1.4rem;
-        font-weight: 700;
-        margin-bottom: 10px;
-        color: #2c5282 !important;
-    }
-    
-    .info-box p {
-        color: #2c5282 !important;
-        font-weight: 500;
-    }
-    
-    /* Prompt cards - FIXED CONTRAST */
-    .prompt-card {
-        background: white;
-        color: #1a202c !important;
-        padding: 20px;
-        border-radius: 15px;
-        margin: 10px 0;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        border: 2px solid #4299e1;
-    }
-    
-    .prompt-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 25px rgba(66, 153, 225, 0.3);
-        border-color: #3182ce;
-        background: #f7fafc;
-    }
-    
-    .prompt-title {
-        font-size: 1.2rem;
-        font-weight: 700;
-        margin-bottom: 8px;
-        color: #1a202c !important;
-    }
-    
-    .prompt-desc {
-        font-size: 0.95rem;
-        line-height: 1.5;
-        color: #2d3748 !important;
-        font-weight: 500;
-    }
-    
-    .prompt-tag {
-        display: inline-block;
-        background: #4299e1;
-        color: white !important;
-        padding: 6px 14px;
-        border-radius: 20px;
-        font-size: 0.8rem;
-        margin-top: 10px;
-        font-weight: 700;
-    }
-    
-    /* Stats dashboard - HIGH CONTRAST */
-    .stats-container {
-        display: grid;
-        grid-template-columns: repeat(4, 1fr);
-        gap: 20px;
-        margin: 30px 0;
-    }
-    
-    .stat-box {
-        background: white;
-        padding: 25px;
-        border-radius: 15px;
-        text-align: center;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        border: 2px solid #e2e8f0;
-        transition: all 0.3s ease;
-    }
-    
-    .stat-box:hover {
-        border-color: #4299e1;
-        transform: translateY(-3px);
-        box-shadow: 0 6px 20px rgba(66, 153, 225, 0.2);
-    }
-    
-    .stat-icon {
-        font-size: 3rem;
-        margin-bottom: 10px;
-    }
-    
-    .stat-value {
-        font-size: 2.5rem;
-        font-weight: 800;
-        color: #1a202c !important;
-        margin: 10px 0;
-    }
-    
-    .stat-label {
-        color: #2d3748 !important;
-        font-size: 1rem;
-        font-weight: 600;
-    }
-    
-    /* Answer display - HIGH CONTRAST */
-    .answer-container {
-        background: white;
-        padding: 30px;
-        border-radius: 15px;
-        margin: 20px 0;
-        border-left: 6px solid #4299e1;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        color: #1a202c !important;
-        border: 1px solid #e2e8f0;
-    }
-    
-    .answer-text {
-        color: #1a202c !important;
-        line-height: 1.8;
-        font-size: 1.05rem;
-        font-weight: 500;
-    }
-    
-    /* Mode badge */
-    .mode-badge {
-        display: inline-flex;
-        align-items: center;
-        background: linear-gradient(135deg, #4299e1 0%, #3182ce 100%);
-        color: white !important;
-        padding: 12px 20px;
-        border-radius: 25px;
-        font-weight: 700;
-        margin: 15px 0;
-        box-shadow: 0 4px 15px rgba(66, 153, 225, 0.3);
-    }
-    
-    /* Source cards - HIGH CONTRAST */
-    .source-card {
-        background: white;
-        padding: 20px;
-        border-radius: 12px;
-        margin: 15px 0;
-        border-left: 4px solid #3182ce;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.08);
-        color: #1a202c !important;
-        border: 1px solid #e2e8f0;
-    }
-    
-    .source-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 12px;
-        color: #1a202c !important;
-    }
-    
-    .source-content {
-        background: #f7fafc;
-        padding: 15px;
-        border-radius: 8px;
-        color: #2d3748 !important;
-        line-height: 1.6;
-        border: 1px solid #e2e8f0;
-        font-weight: 500;
-    }
-    
-    /* Similarity badges - HIGH CONTRAST TEXT */
-    .sim-high { 
-        background: #38a169;
-        color: white !important;
-        padding: 6px 12px;
-        border-radius: 20px;
-        font-weight: 700;
-        font-size: 0.85rem;
-    }
-    
-    .sim-medium { 
-        background: #dd6b20;
-        color: white !important;
-        padding: 6px 12px;
-        border-radius: 20px;
-        font-weight: 700;
-        font-size: 0.85rem;
-    }
-    
-    .sim-low { 
-        background: #e53e3e;
-        color: white !important;
-        padding: 6px 12px;
-        border-radius: 20px;
-        font-weight: 700;
-        font-size: 0.85rem;
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #4299e1 0%, #3182ce 100%);
-        color: white !important;
-        border: none;
-        padding: 14px 28px;
-        border-radius: 10px;
-        font-weight: 700;
-        font-size: 1rem;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(66, 153, 225, 0.3);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(66, 153, 225, 0.4);
-        background: linear-gradient(135deg, #3182ce 0%, #2c5282 100%);
-    }
-    
-    /* Text area */
-    .stTextArea textarea {
-        border: 2px solid #4299e1;
-        border-radius: 12px;
-        font-size: 1.05rem;
-        padding: 15px;
-        background: white;
-        color: #1a202c !important;
-    }
-    
-    /* Feature highlights - HIGH CONTRAST */
-    .feature-grid {
-        display: grid;
-        grid-template-columns: repeat(3, 1fr);
-        gap: 20px;
-        margin: 30px 0;
-    }
-    
-    .feature-box {
-        background: white;
-        padding: 25px;
-        border-radius: 15px;
-        text-align: center;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        transition: all 0.3s ease;
-        border: 2px solid #e2e8f0;
-        color: #1a202c !important;
-    }
-    
-    .feature-box:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-        border-color: #4299e1;
-    }
-    
-    .feature-box h3 {
-        color: #1a202c !important;
-        font-weight: 700;
-        margin: 15px 0;
-    }
-    
-    .feature-box p {
-        color: #2d3748 !important;
-        font-weight: 500;
-        line-height: 1.6;
-    }
-    
-    .feature-icon-large {
-        font-size: 3.5rem;
-        margin-bottom: 15px;
-    }
-    
-    /* Progress styling */
-    .stProgress > div > div > div > div {
-        background: linear-gradient(90deg, #4299e1, #3182ce);
-    }
-    
-    /* Footer - HIGH CONTRAST */
-    .footer-box {
-        text-align: center;
-        padding: 30px;
-        background: #1a202c;
-        color: white !important;
-        border-radius: 15px;
-        margin-top: 40px;
-    }
-    
-    .footer-title {
-        margin: 0 0 10px 0;
-        color: white !important;
-        font-size: 1.5rem;
-        font-weight: 700;
-    }
-    
-    .footer-text {
-        margin: 0;
-        font-size: 0.95rem;
-        color: #e2e8f0 !important;
-        font-weight: 500;
-    }
-    
-    /* Direct query display */
-    .direct-query-box {
-        background: white;
-        border: 2px solid #4299e1;
-        border-radius: 12px;
-        padding: 15px 20px;
-        margin: 10px 0;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-    }
-    
-    .direct-query-box:hover {
-        background: #f7fafc;
-        transform: translateX(5px);
-        box-shadow: 0 4px 12px rgba(66, 153, 225, 0.2);
-    }
-    
-    .direct-query-text {
-        color: #1a202c !important;
-        font-size: 1.05rem;
-        font-weight: 600;
-        margin: 0;
-    }
-    
-    .direct-query-icon {
-        color: #4299e1 !important;
-        font-size: 1.3rem;
-        margin-right: 10px;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Initialize Gemini
+# Professional CSS styling with FIXED CONTRAST (static/styles.css, read once per process).
+# The <style> block is still re-sent on every rerun: Streamlit 1.29's static serving
+# returns .css as text/plain with nosniff, so browsers refuse it as a linked stylesheet
 @st.cache_resource
-def load_gemini():
-    return configure_gemini()
+def load_css():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'styles.css'), encoding='utf-8') as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
-generation_model = load_gemini()
+# Normally already started by serve.py at process start; these are no-ops then.
+# Under a bare `streamlit run app.py` they start here, on the first page load.
+start_status_server()
+start_metrics_file_exporter()
+backend = start_backend()
 
 # Initialize session state
 if 'selected_prompt' not in st.session_state:
@@ -488,98 +42,31 @@ if 'query_safety_status' not in st.session_state:
 if 'display_mode' not in st.session_state:
     st.session_state.display_mode = 'cards'  # 'cards' or 'direct'
 
-# Smart RAG function
-def rag_answer_smart_app(query, top_k=3):
-    """Advanced RAG with intelligent fallback"""
-    retrieved = rag_system.retrieve_with_scores(query, top_k=top_k)
-    all_low_relevance = all(r['similarity'] < 0.3 for r in retrieved) if retrieved else True
-    
-    if all_low_relevance and retrieved:
-        prompt = f"""MEDICAL QUESTION: {query}
-
-You are a medical expert. Provide accurate, evidence-based information.
-Answer comprehensively with proper medical terminology and structure your response with clear sections."""
-        mode = "general_knowledge"
-    else:
-        ctx_formatted = []
-        for i, r in enumerate(retrieved):
-            doc_preview = r['document'][:500] + "..." if len(r['document']) > 500 else r['document']
-            ctx_formatted.append(f"[Document {i+1}, Relevance: {r['similarity']:.3f}]:\n{doc_preview}")
-        
-        context_str = "\n\n".join(ctx_formatted)
-        
-        prompt = f"""You are a medical analyst with access to patient records. Provide comprehensive analysis.
-
-QUESTION: {query}
-
-PATIENT RECORDS:
-{context_str}
-
-INSTRUCTIONS:
-1. Analyze what the patient records reveal
-2. Identify patterns and correlations
-3. Supplement with general medical knowledge where appropriate
-4. Always cite specific documents (Document 1, 2, etc.)
-5. Structure response with clear sections and bullet points
-6. Include: "Analysis based on {len(retrieved)} patient records and medical literature"
+if 'query_runner' not in st.session_state:
+    st.session_state.query_runner = QueryRunner()
+if 'conversation' not in st.session_state:
+    st.session_state.conversation = ConversationSession()
 
-COMPREHENSIVE ANALYSIS:"""
-        mode = "rag_with_supplement"
-    
-    response = generation_model.generate_content(prompt)
-    return response.text, retrieved, mode
+def wait_for(future, on_wait=None):
+    """Block on a future while keeping the script responsive to reruns"""
+    while True:
+        try:
+            return future.result(timeout=0.25)
+        except FutureTimeoutError:
+            # Touching the page gives Streamlit a point to stop this run if the user reruns
+            if on_wait:
+                on_wait()
 
-# Strategic prompt examples that showcase system strengths
-SHOWCASE_PROMPTS = {
-    "🔍 Multi-Patient Pattern Analysis": {
-        "query": "Analyze all patients with cardiovascular conditions and identify common risk factors, medications, and treatment outcomes across the dataset",
-        "description": "Demonstrates cross-document analysis and pattern recognition across multiple patient records",
-        "tag": "Multi-doc retrieval + Synthesis",
-        "icon": "🔍"
-    },
-    "💊 Medication Efficacy Comparison": {
-        "query": "Compare treatment approaches for atrial fibrillation patients - which medications appear most effective and what are the documented side effects?",
-        "description": "Showcases ability to extract, compare, and synthesize treatment data from multiple sources",
-        "tag": "Comparative analysis + Evidence synthesis",
-        "icon": "💊"
-    },
-    "📊 Symptom-to-Diagnosis Correlation": {
-        "query": "What are the most common symptom combinations that lead to migraine diagnosis, and how do treatment plans vary based on severity?",
-        "description": "Highlights pattern recognition and clinical correlation capabilities",
-        "tag": "Pattern detection + Clinical reasoning",
-        "icon": "📊"
-    },
-    "⚠️ Risk Factor Identification": {
-        "query": "Identify patients with diabetes who also have cardiovascular complications - what are the common risk factors and preventive measures mentioned?",
-        "description": "Demonstrates complex filtering, correlation analysis, and risk assessment",
-        "tag": "Complex queries + Risk analysis",
-        "icon": "⚠️"
-    },
-    "🧬 Comorbidity Analysis": {
-        "query": "Find patients with multiple chronic conditions and analyze how their treatment plans address drug interactions and comorbidity management",
-        "description": "Shows sophisticated multi-condition analysis and clinical decision support",
-        "tag": "Complex medical reasoning",
-        "icon": "🧬"
-    },
-    "📈 Treatment Timeline Analysis": {
-        "query": "Trace the progression of treatment for patients with hypertension - from initial diagnosis through medication adjustments to outcome",
-        "description": "Demonstrates temporal reasoning and longitudinal analysis capabilities",
-        "tag": "Temporal analysis + Progression tracking",
-        "icon": "📈"
-    },
-    "🎯 Precision Medicine Query": {
-        "query": "For patients over 65 with heart conditions, what are the medication dosage patterns and how do they differ from younger patients?",
-        "description": "Showcases demographic filtering and precision medicine insights",
-        "tag": "Demographic analysis + Precision insights",
-        "icon": "🎯"
-    },
-    "🔬 Diagnostic Differential Analysis": {
-        "query": "When patients present with chest pain and shortness of breath, what diagnostic tests are ordered and what conditions are ultimately diagnosed?",
-        "description": "Highlights clinical reasoning and differential diagnosis support",
-        "tag": "Clinical reasoning + Diagnostics",
-        "icon": "🔬"
-    }
-}
+# Smart RAG function
+def rag_answer_smart_app(query, top_k=3, adaptive=False, session=None, on_wait=None):
+    """Advanced RAG with intelligent fallback, run through the async pipeline"""
+    rag_system, generation_model, precomputed_store = wait_for(backend, on_wait)
+    # Submitting cancels this session's previous query if it is still running
+    future = st.session_state.query_runner.submit(
+        query, rag_system, generation_model, top_k=top_k, precomputed_store=precomputed_store,
+        adaptive=adaptive, session=session
+    )
+    return wait_for(future, on_wait)
 
 # Header
 st.markdown('<h1 class="hero-title">🏥 Medical Intelligence RAG System</h1>', unsafe_allow_html=True)
@@ -656,6 +143,32 @@ st.markdown('<h2 class="section-header">🔍 Ask Your Question</h2>', unsafe_all
 with st.sidebar:
     st.markdown("### ⚙️ System Configuration")
     top_k = st.slider("Documents to retrieve", 1, 10, 3, help="More documents = broader context but slower processing")
+    adaptive_k = st.checkbox(
+        "Adaptive document count",
+        value=True,
+        help="Use only as many documents (up to the slider value) as clear the relevance bar and score gap"
+    )
+    
+    conversation_mode = st.checkbox(
+        "Conversation mode",
+        value=False,
+        help="Treat follow-up questions as part of one analysis session and reuse its retrieved records"
+    )
+    if conversation_mode:
+        st.caption(f"💬 {len(st.session_state.conversation)} turns in this conversation")
+        if st.button("🧹 New conversation", use_container_width=True):
+            st.session_state.conversation.clear()
+            st.rerun()
+    
+    warmup_status = readiness_status()
+    if backend.done() and backend.exception():
+        st.caption(f"⚠️ Startup failed: {backend.exception()}")
+    elif warmup_status['ready']:
+        st.caption(f"🔥 System warmed up in {warmup_status['duration']:.1f}s")
+    elif warmup_status['error']:
+        st.caption(f"⚠️ Warm-up failed, retrying: {warmup_status['error']}")
+    else:
+        st.caption("⏳ Warming up models and index...")
     
     st.markdown("---")
     st.markdown("### 🛠️ Technology Stack")
@@ -711,8 +224,23 @@ if clear_btn:
 if search_btn and query:
     st.markdown("---")
     
-    # Perform safety check
-    is_safe, safety_status, safety_category = check_query_safety(query)
+    # Safety check, retrieval and cache lookups run concurrently in the async pipeline
+    status = st.empty()
+    start_time = time.time()
+    # ?profile=1 in the URL (or RAG_PROFILE / RAG_PROFILE_SAMPLE) captures a profile of this request
+    profile_flag = st.experimental_get_query_params().get('profile', ['0'])[0] == '1'
+    # The script thread only polls the future; the .pstats comes from the pipeline stages
+    with profile_request('query', enabled=profile_flag, profile_caller=False):
+        result = rag_answer_smart_app(
+            query,
+            top_k=top_k,
+            adaptive=adaptive_k,
+            session=st.session_state.conversation if conversation_mode else None,
+            on_wait=lambda: status.markdown(f"🔍 **Analyzing medical records...** {time.time() - start_time:.1f}s")
+        )
+    total_time = time.time() - start_time
+    status.empty()
+    is_safe, safety_status, safety_category = result['safe'], result['status'], result['category']
     
     # Update session state
     st.session_state.query_safety_status = {
@@ -754,6 +282,7 @@ if search_btn and query:
             </div>
             """, unsafe_allow_html=True)
         
+        inc('rag_queries_total', outcome=safety_status)
         st.stop()
     else:
         # Show safety confirmation
@@ -766,29 +295,24 @@ if search_btn and query:
         </div>
         """, unsafe_allow_html=True)
     
-    # Progress tracking
-    progress_bar = st.progress(0)
-    status = st.empty()
-    
-    status.markdown("🔍 **Phase 1/3:** Searching medical records database...")
-    start_time = time.time()
-    progress_bar.progress(20)
-    time.sleep(0.3)
-    
-    status.markdown("🤖 **Phase 2/3:** Generating intelligent analysis...")
-    answer, sources, mode = rag_answer_smart_app(query, top_k=top_k)
-    progress_bar.progress(70)
-    time.sleep(0.2)
+    answer, sources, mode = result['answer'], result['sources'], result['mode']
+    if result['precomputed']:
+        st.caption("⚡ Served from precomputed showcase answers")
+        inc('rag_queries_total', outcome='precomputed')
+    else:
+        inc('rag_queries_total', outcome=mode)
     
-    status.markdown("📊 **Phase 3/3:** Formatting comprehensive results...")
-    progress_bar.progress(90)
-    time.sleep(0.2)
+    if conversation_mode:
+        st.session_state.conversation.record_turn(query, result.get('query_embedding'), answer, sources)
+        if result.get('session_retrieval') == 'reused':
+            st.caption("💬 Follow-up answered from records already retrieved in this conversation")
     
-    total_time = time.time() - start_time
-    progress_bar.progress(100)
-    time.sleep(0.3)
-    progress_bar.empty()
-    status.empty()
+    decision = result.get('retrieval_decision')
+    if decision:
+        if decision['kept'] == 0:
+            st.caption(f"🧭 Adaptive retrieval: no record cleared the relevance bar (best {decision['top_similarity']}), answering from general knowledge")
+        else:
+            st.caption(f"🧭 Adaptive retrieval: using {decision['kept']} of {decision['candidates']} documents ({decision['reason'].replace('_', ' ').replace('+', ', ')})")
     
     # Mode indicator
     mode_emoji = "📚" if mode == "general_knowledge" else "🎯"
@@ -832,6 +356,23 @@ if search_btn and query:
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
+    
+    # Keyword matches found alongside the semantic search
+    keyword_hits = result.get('keyword_hits') or []
+    if keyword_hits:
+        with st.expander(f"🔑 View Keyword Matches ({len(keyword_hits)} BM25 hits)", expanded=False):
+            for r in keyword_hits:
+                st.markdown(f"""
+                <div class="source-card">
+                    <div class="source-header">
+                        <strong style='color: #1a202c !important; font-size: 1.1rem;'>🔑 Match #{r['rank']}</strong>
+                        <span class='sim-medium'>BM25: {r['bm25_score']:.2f}</span>
+                    </div>
+                    <div class="source-content">
+                        {r['document'][:500]}{'...' if len(r['document']) > 500 else ''}
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
 
 # Footer with system highlights
 st.markdown("---")
@@ -0,0 +1,175 @@
+import asyncio
+import threading
+
+from safety import check_query_safety
+from rag_pipeline import (build_prompt, build_adaptive_prompt, normalize_query, with_history,
+                          ADAPTIVE_MIN_RELEVANCE)
+from instrumentation import span, record_generation_tokens, call_in_trace
+from profiling import profiled_call
+from single_flight import AsyncSingleFlight
+
+_loop = None
+_loop_lock = threading.Lock()
+
+# Lives on the shared loop, so every session's identical query lands in the same flight
+_query_flights = AsyncSingleFlight('query')
+
+
+def get_event_loop():
+    """One long-lived event loop per process, running on a daemon thread
+
+    Streamlit script runs are plain threads without a loop of their own, so every
+    session submits its pipeline coroutines to this shared loop.
+    """
+    global _loop
+
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='rag-async-loop', daemon=True).start()
+    return _loop
+
+
+def _in_span(name, fn, *args):
+    # Runs on a worker thread, which cannot suspend mid-call, so binding it to the trace is safe
+    with span(name):
+        return call_in_trace(profiled_call, fn, *args)
+
+
+def _stage(name, fn, *args):
+    """Run a blocking stage on a worker thread, timed under its own span"""
+    return asyncio.create_task(asyncio.to_thread(_in_span, name, fn, *args))
+
+
+async def _generate(generation_model, prompt):
+    # Native async call can be cancelled mid-request; the sync fallback only stops being awaited
+    if hasattr(generation_model, 'generate_content_async'):
+        return await generation_model.generate_content_async(prompt)
+    return await asyncio.to_thread(call_in_trace, profiled_call, generation_model.generate_content, prompt)
+
+
+async def _cancel_all(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _dense_retrieve(rag, query, top_k, session):
+    # Returns (results, session retrieval path, query embedding)
+    if session is not None:
+        return session.retrieve(rag, query, top_k, ADAPTIVE_MIN_RELEVANCE)
+    q_emb = rag.encode_query(query)
+    return rag.search_by_embedding(q_emb, top_k=top_k), None, q_emb
+
+
+async def rag_answer_async(query, rag, generation_model, top_k=3, precomputed_store=None, adaptive=False,
+                           session=None):
+    """Answer a query, sharing one computation among identical in-flight requests
+
+    Requests coalesce on (normalized query, top_k, adaptive, index version); the
+    returned dict is shared between them and must be treated as read-only.
+    Follow-ups in a session with history depend on that history, so they run
+    on their own.
+    """
+    if session is not None and len(session):
+        return await _run_pipeline(query, rag, generation_model, top_k, None, adaptive, session)
+
+    key = (normalize_query(query), top_k, adaptive, rag.index_version)
+    return await _query_flights.run(
+        key,
+        lambda: _run_pipeline(query, rag, generation_model, top_k, precomputed_store, adaptive, None)
+    )
+
+
+async def _run_pipeline(query, rag, generation_model, top_k, precomputed_store, adaptive, session):
+    """Run the query pipeline with independent stages overlapped
+
+    Safety check, precomputed-answer lookup and BM25 search start together; the
+    dense search starts as soon as the lookup misses, and generation as soon as
+    the safety verdict and dense context are in. Returns a dict with the safety verdict and, for safe queries, the
+    answer, sources, mode and keyword matches (plus the retrieval decision in
+    adaptive mode, where top_k is only an upper bound).
+    """
+    with span('query', top_k=top_k, adaptive=adaptive):
+        safety_task = _stage('safety_check', check_query_safety, query)
+        keyword_task = _stage('keyword_retrieve', rag.keyword_search, query, top_k)
+        pending = [safety_task, keyword_task]
+        cached_task = None
+        if precomputed_store is not None:
+            # Only answers built with the same top_k and adaptive setting are served
+            cached_task = _stage('precomputed_lookup', precomputed_store.lookup, query, rag.index_version,
+                                 top_k, adaptive)
+            pending.append(cached_task)
+
+        try:
+            # The lookup is an in-memory dict hit, so checking it before starting the dense
+            # search costs nothing and spares showcase clicks an encode + index scan
+            cached = await cached_task if cached_task is not None else None
+            dense_task = None
+            if not cached:
+                dense_task = _stage('retrieve', _dense_retrieve, rag, query, top_k, session)
+                pending.append(dense_task)
+
+            is_safe, safety_status, safety_category = await safety_task
+            result = {'safe': is_safe, 'status': safety_status, 'category': safety_category}
+            if not is_safe:
+                return result
+
+            if cached:
+                answer, sources, mode = cached
+                result.update(answer=answer, sources=sources, mode=mode, precomputed=True,
+                              keyword_hits=await keyword_task, query_embedding=None)
+                return result
+
+            retrieved, session_retrieval, q_emb = await dense_task
+            decision = None
+            with span('prompt_build') as s:
+                if adaptive:
+                    prompt, mode, retrieved, decision = build_adaptive_prompt(query, retrieved)
+                    s['attributes'].update(decision)
+                else:
+                    prompt, mode = build_prompt(query, retrieved)
+                if session is not None:
+                    prompt = with_history(prompt, session.condensed_history())
+                    s['attributes'].update(session_retrieval=session_retrieval)
+                s['attributes'].update(mode=mode, prompt_chars=len(prompt))
+
+            with span('generate') as s:
+                response = await _generate(generation_model, prompt)
+                prompt_tokens, output_tokens = record_generation_tokens(response, prompt)
+                s['attributes'].update(prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+
+            result.update(answer=response.text, sources=retrieved, mode=mode, precomputed=False,
+                          keyword_hits=await keyword_task, retrieval_decision=decision,
+                          session_retrieval=session_retrieval, query_embedding=q_emb)
+            return result
+        finally:
+            # Every exit (blocked query, cancellation, a failed stage) stops and reaps the
+            # stages still running, so none is left with an unretrieved exception
+            await _cancel_all(pending)
+
+
+class QueryRunner:
+    """Per-session handle that keeps at most one pipeline in flight
+
+    Submitting a new query cancels the previous one, so a user who changes their
+    question does not keep paying for the old generation.
+    """
+
+    def __init__(self):
+        self._future = None
+        self._lock = threading.Lock()
+
+    def submit(self, query, rag, generation_model, top_k=3, precomputed_store=None, adaptive=False, session=None):
+        coro = rag_answer_async(
+            query, rag, generation_model, top_k=top_k, precomputed_store=precomputed_store,
+            adaptive=adaptive, session=session
+        )
+        with self._lock:
+            self.cancel()
+            self._future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+            return self._future
+
+    def cancel(self):
+        if self._future is not None and not self._future.done():
+            self._future.cancel()
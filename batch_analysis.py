@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from safety import check_query_safety
+from rag_pipeline import build_prompt, build_adaptive_prompt
+from instrumentation import span, record_generation_tokens
+from profiling import profile_request
+
+QUERY_FIELDS = ('query', 'question', 'body', 'title')
+ID_FIELDS = ('id', 'query_id', 'request_id')
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls evenly at `per_minute`"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def read_queries(path, query_field=None, id_field=None):
+    """Yield (id, query, record) from a JSONL file; blank lines are skipped"""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            field = query_field or next((k for k in QUERY_FIELDS if record.get(k)), None)
+            if field is None or not record.get(field):
+                raise ValueError(f"❌ Line {line_no}: no query field (tried {', '.join(QUERY_FIELDS)})")
+            key = id_field or next((k for k in ID_FIELDS if k in record), None)
+            yield str(record[key]) if key else f"line-{line_no}", record[field], record
+
+
+def load_checkpoint(path):
+    """Ids already written by a previous run"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def generate_with_retry(generation_model, prompt, limiter, retries=3, backoff=2.0):
+    for attempt in range(retries):
+        limiter.wait()
+        try:
+            return generation_model.generate_content(prompt)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def answer_one(item, retrieved, generation_model, limiter, adaptive):
+    """Build the prompt and generate for one query whose retrieval is already done"""
+    query_id, query, timings = item['id'], item['query'], dict(item['timings'])
+    result = {'id': query_id, 'query': query}
+
+    start = time.time()
+    with span('prompt_build'):
+        if adaptive:
+            prompt, mode, retrieved, decision = build_adaptive_prompt(query, retrieved)
+            result['retrieval_decision'] = decision
+        else:
+            prompt, mode = build_prompt(query, retrieved)
+    try:
+        with span('generate'):
+            response = generate_with_retry(generation_model, prompt, limiter)
+            prompt_tokens, output_tokens = record_generation_tokens(response, prompt)
+        result.update(status='answered', mode=mode, answer=response.text,
+                      prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+    except Exception as e:
+        result.update(status='error', mode=mode, error=f"{type(e).__name__}: {e}")
+    timings['generation'] = round(time.time() - start, 4)
+
+    result['sources'] = [{'doc_id': r['doc_id'], 'similarity': r['similarity']} for r in retrieved]
+    result['timings'] = timings
+    return result
+
+
+def run_batch(items, rag, generation_model, out_f, checkpoint_f, top_k=3, adaptive=False,
+              concurrency=4, per_minute=60, batch_size=32):
+    """Retrieve in batches, generate with bounded concurrency, stream results as they finish"""
+    limiter = RateLimiter(per_minute)
+    written = 0
+
+    def emit(result):
+        nonlocal written
+        result['timings']['total'] = round(sum(v for k, v in result['timings'].items() if k != 'total'), 4)
+        out_f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out_f.flush()
+        # Checkpoint only after the result is on disk, so a crash never skips a query;
+        # failed generations stay unchecked and are retried on the next run
+        if result['status'] != 'error':
+            checkpoint_f.write(result['id'] + "\n")
+            checkpoint_f.flush()
+        written += 1
+        print(f"✅ [{written}/{len(items)}] {result['id']}: {result['status']}")
+
+    pending = set()
+
+    def drain(block):
+        # Emit whatever finished; when blocking, wait for at least one so the queue stays bounded
+        nonlocal pending
+        if block:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        else:
+            done = {f for f in pending if f.done()}
+            pending -= done
+        for future in done:
+            emit(future.result())
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-generate') as pool:
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+
+            safe = []
+            for item in chunk:
+                t = time.time()
+                is_safe, status, category = check_query_safety(item['query'])
+                item['timings'] = {'safety': round(time.time() - t, 4)}
+                if is_safe:
+                    safe.append(item)
+                else:
+                    emit({'id': item['id'], 'query': item['query'], 'status': 'blocked',
+                          'safety_status': status, 'safety_category': category, 'timings': item['timings']})
+
+            if not safe:
+                continue
+            t = time.time()
+            batch_results = rag.retrieve_batch([item['query'] for item in safe], top_k=top_k)
+            per_query = round((time.time() - t) / len(safe), 4)
+
+            # The next chunk is retrieved while this one is still generating
+            for item, retrieved in zip(safe, batch_results):
+                item['timings']['retrieval'] = per_query
+                pending.add(pool.submit(answer_one, item, retrieved, generation_model, limiter, adaptive))
+            drain(block=False)
+            while len(pending) > concurrency * 4:
+                drain(block=True)
+
+        for future in as_completed(pending):
+            emit(future.result())
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of queries through the RAG pipeline offline")
+    parser.add_argument('input', help="JSONL with one query per line (field: query/question/body/title)")
+    parser.add_argument('--output', default=None, help="Results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument('--checkpoint', default=None, help="Completed ids (default: <output>.checkpoint)")
+    parser.add_argument('--query-field', default=None, help="Field holding the query text")
+    parser.add_argument('--id-field', default=None, help="Field holding a stable query id")
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--adaptive', action='store_true', help="Adaptive document count (top-k becomes the cap)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Generation calls in flight")
+    parser.add_argument('--rate-limit', type=float, default=60, help="Generation calls per minute (0 = unlimited)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Queries per encoder/index batch")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start over")
+    parser.add_argument('--profile', action='store_true', help="Write a cProfile + flamegraph profile of the run")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    checkpoint = args.checkpoint or f"{output}.checkpoint"
+    if args.restart:
+        for path in (output, checkpoint):
+            if os.path.exists(path):
+                os.remove(path)
+
+    done = load_checkpoint(checkpoint)
+    items = [
+        {'id': query_id, 'query': query}
+        for query_id, query, _ in read_queries(args.input, args.query_field, args.id_field)
+        if query_id not in done
+    ]
+    print(f"📋 {len(items)} queries to run ({len(done)} already done)")
+    if not items:
+        return
+
+    from retrieval_system import get_rag_system
+    from api_config import configure_gemini
+
+    start = time.time()
+    with open(output, 'a', encoding='utf-8') as out_f, open(checkpoint, 'a', encoding='utf-8') as checkpoint_f, \
+            profile_request('batch', enabled=args.profile, all_threads=True):
+        written = run_batch(
+            items, get_rag_system(), configure_gemini(), out_f, checkpoint_f,
+            top_k=args.top_k, adaptive=args.adaptive, concurrency=args.concurrency,
+            per_minute=args.rate_limit, batch_size=args.batch_size
+        )
+    print(f"🏁 {written} results written to {output} in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Seconds for a fresh interpreter to import everything app.py imports (Streamlit itself excluded)
+DEFAULT_BUDGET = 1.0
+# Must only be imported once the system is actually built, never by importing the app
+HEAVY_MODULES = ('torch', 'faiss', 'sentence_transformers', 'transformers', 'google.generativeai', 'rank_bm25')
+IGNORED_MODULES = ('streamlit',)
+
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def app_imports(path=os.path.join(APP_DIR, 'app.py')):
+    """Top-level modules imported by the app script, in order"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(n for n in names if n.split('.')[0] not in IGNORED_MODULES and n not in modules)
+    return modules
+
+
+def measure(modules):
+    """Import `modules` in a fresh interpreter; returns (seconds, heavy modules it loaded, -X importtime log)"""
+    code = PROBE.format(modules=modules, heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        errors = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith('import time:'))
+        raise RuntimeError(f"❌ Import failed:\n{errors}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result['seconds'], result['heavy'], proc.stderr
+
+
+def slowest_imports(importtime_log, limit=10):
+    """Top-level packages by cumulative import time from a -X importtime log"""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the package that triggered them
+        if not name[1:].startswith(' '):
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the app is slow or pulls in heavy dependencies")
+    parser.add_argument('--budget', type=float, default=float(os.getenv("RAG_IMPORT_BUDGET", DEFAULT_BUDGET)),
+                        help="Seconds allowed (default: RAG_IMPORT_BUDGET or 1.0)")
+    args = parser.parse_args()
+
+    modules = app_imports()
+    seconds, heavy, log = measure(modules)
+    print(f"⏱️ Importing {len(modules)} app modules took {seconds:.3f}s (budget {args.budget:.3f}s)")
+    for micros, name in slowest_imports(log):
+        print(f"   {micros / 1e6:8.3f}s  {name}")
+
+    failed = False
+    if heavy:
+        print(f"❌ Heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if seconds > args.budget:
+        print("❌ Import time over budget")
+        failed = True
+    if not failed:
+        print("✅ Import budget met")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
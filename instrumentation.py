@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from status_server import register_route
+
+# Seconds; covers sub-millisecond FAISS searches up to slow Gemini generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+
+_current_span = contextvars.ContextVar('rag_current_span', default=None)
+_trace_lock = threading.Lock()
+# Trace id of the innermost open span per thread, so the stack sampler can tell requests apart
+_thread_traces = {}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name, text):
+    """Attach HELP text to a metric for the Prometheus exposition"""
+    _help[name] = text
+
+
+def inc(name, value=1, **labels):
+    """Increment a counter"""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record a histogram sample"""
+    key = (name, _label_key(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(hist['buckets']):
+            if value <= bound:
+                hist['counts'][i] += 1
+        hist['sum'] += value
+        hist['count'] += 1
+
+
+def counter_value(name, **labels):
+    with _lock:
+        return _counters.get((name, _label_key(labels)), 0)
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{k}="{str(v)}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+        histograms = [(key, {**h, 'counts': list(h['counts'])}) for key, h in histograms]
+
+    seen = set()
+    for (name, label_key), value in counters:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(label_key)} {value}")
+
+    for (name, label_key), hist in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in zip(hist['buckets'], hist['counts']):
+            lines.append(f"{name}_bucket{_format_labels(label_key, [('le', bound)])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(label_key, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(label_key)} {round(hist['sum'], 6)}")
+        lines.append(f"{name}_count{_format_labels(label_key)} {hist['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def active_trace_ids():
+    """Snapshot of {thread id: trace id} for threads running blocking work of a trace"""
+    return dict(_thread_traces)
+
+
+@contextmanager
+def _bind_thread(trace_id):
+    thread_id = threading.get_ident()
+    outer_trace = _thread_traces.get(thread_id)
+    _thread_traces[thread_id] = trace_id
+    try:
+        yield
+    finally:
+        if outer_trace is None:
+            _thread_traces.pop(thread_id, None)
+        else:
+            _thread_traces[thread_id] = outer_trace
+
+
+def call_in_trace(fn, *args):
+    """Run fn attributing this thread to the current span's trace, for the stack sampler
+
+    Only for blocking calls on worker threads (asyncio.to_thread and
+    copy_context().run carry the span over). span() itself does not bind the
+    thread: on the event loop, spans stay open across awaits while other
+    requests' coroutines run on the same thread.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return fn(*args)
+    with _bind_thread(parent['trace_id']):
+        return fn(*args)
+
+
+def _export_span(record):
+    trace_path = os.getenv("RAG_TRACE_FILE")
+    if not trace_path:
+        return
+    with _trace_lock:
+        with open(trace_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a pipeline stage; nested spans share a trace id (OpenTelemetry-style)
+
+    Durations land in the rag_stage_seconds histogram. When RAG_TRACE_FILE is set
+    each finished span is also appended to that file as one JSON line.
+    """
+    parent = _current_span.get()
+    record = {
+        'trace_id': parent['trace_id'] if parent else uuid.uuid4().hex,
+        'span_id': uuid.uuid4().hex[:16],
+        'parent_id': parent['span_id'] if parent else None,
+        'name': name,
+        'start_time': time.time(),
+        'attributes': dict(attributes),
+        'status': 'ok'
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['status'] = 'error'
+        record['attributes']['error'] = f"{type(e).__name__}: {e}"
+        inc('rag_stage_errors_total', stage=name)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        record['duration'] = round(duration, 6)
+        observe('rag_stage_seconds', duration, stage=name)
+        _export_span(record)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup; hit rate is hits / (hits + misses) per cache"""
+    inc('rag_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def record_generation_tokens(response, prompt):
+    """Record prompt/response token counts, estimating when the SDK gives no usage data"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None and getattr(usage, 'prompt_token_count', None) is not None:
+        prompt_tokens = usage.prompt_token_count
+        output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+        source = 'api'
+    else:
+        # Roughly four characters per token for English clinical text
+        prompt_tokens = len(prompt) // 4
+        output_tokens = len(getattr(response, 'text', '') or '') // 4
+        source = 'estimate'
+
+    inc('rag_generation_tokens_total', prompt_tokens, kind='prompt', source=source)
+    inc('rag_generation_tokens_total', output_tokens, kind='output', source=source)
+    observe('rag_prompt_tokens', prompt_tokens, buckets=TOKEN_BUCKETS)
+    return prompt_tokens, output_tokens
+
+
+def write_metrics_file(path):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+_file_exporter = None
+
+
+def start_metrics_file_exporter(path=None, interval=15.0):
+    """Periodically dump metrics to RAG_METRICS_FILE (for node_exporter's textfile collector)"""
+    global _file_exporter
+
+    path = path or os.getenv("RAG_METRICS_FILE")
+    if not path or _file_exporter is not None:
+        return _file_exporter
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_metrics_file(path)
+            except OSError as e:
+                print(f"⚠️ Could not write metrics file: {e}")
+
+    _file_exporter = threading.Thread(target=run, name='metrics-exporter', daemon=True)
+    _file_exporter.start()
+    return _file_exporter
+
+
+describe('rag_stage_seconds', 'Wall-clock time spent in each RAG pipeline stage')
+describe('rag_stage_errors_total', 'Pipeline stages that raised an exception')
+describe('rag_cache_requests_total', 'Cache lookups by cache and result')
+describe('rag_generation_tokens_total', 'Tokens sent to and received from the generation model')
+describe('rag_prompt_tokens', 'Prompt size per generation call')
+describe('rag_queries_total', 'Queries handled by outcome')
+describe('rag_adaptive_decisions_total', 'Adaptive retrieval decisions by reason')
+describe('rag_context_documents', 'Documents placed in the prompt by adaptive retrieval')
+describe('rag_session_retrievals_total', 'Follow-up retrievals served from session documents or a fresh search')
+describe('rag_singleflight_total', 'Requests that started (leader) or joined (follower) an in-flight computation')
+
+register_route('/metrics', lambda: (200, 'text/plain; version=0.0.4', render_prometheus()))
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import numpy as np
+
+from instrumentation import span
+
+# rank_bm25's BM25Okapi defaults, so scores stay comparable with the old scorer
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their this to was were
+which with what who whom how when where do does did not no
+""".split())
+
+# Common clinical shorthand expanded to the words the records spell out
+ABBREVIATIONS = {
+    'afib': ['atrial', 'fibrillation'],
+    'af': ['atrial', 'fibrillation'],
+    'htn': ['hypertension'],
+    'dm': ['diabetes'],
+    't2dm': ['type', '2', 'diabetes'],
+    'mi': ['myocardial', 'infarction'],
+    'cad': ['coronary', 'artery', 'disease'],
+    'chf': ['heart', 'failure'],
+    'hf': ['heart', 'failure'],
+    'copd': ['chronic', 'obstructive', 'pulmonary', 'disease'],
+    'sob': ['shortness', 'breath'],
+    'cp': ['chest', 'pain'],
+    'uti': ['urinary', 'tract', 'infection'],
+    'ckd': ['chronic', 'kidney', 'disease'],
+    'bp': ['blood', 'pressure'],
+    'hr': ['heart', 'rate'],
+    'ecg': ['electrocardiogram'],
+    'ekg': ['electrocardiogram'],
+}
+
+LEXICAL_INDEX_DIR = 'bm25_index'
+# Bump when tokenize() changes so persisted indexes are rebuilt
+TOKENIZER_VERSION = 2
+_ARRAYS = ('postings_offsets', 'postings_docs', 'postings_tfs', 'idf', 'doc_len')
+
+
+def stem(token):
+    """Conservative suffix stripping; merges plurals and -ing/-ed forms of a word"""
+    if len(token) <= 4 or token.isdigit():
+        return token
+    if token.endswith(('ies', 'ied')):
+        token = token[:-3] + 'y'
+    elif token.endswith('sses'):
+        token = token[:-2]
+    elif token.endswith('ing') and len(token) > 6:
+        token = token[:-3]
+    elif token.endswith('ed') and len(token) > 5:
+        token = token[:-2]
+    elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        token = token[:-1]
+    # "associate", "associated" and "associating" all end up as "associat"
+    if token.endswith('e') and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text, use_stemming=True, expand_abbreviations=True):
+    """Lowercase, drop JSON punctuation and stop words, normalize shorthand"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if expand_abbreviations and token in ABBREVIATIONS:
+            # Stemmed like any other word so "dm" meets "diabetes" as "diabet"
+            tokens.extend(stem(word) if use_stemming else word for word in ABBREVIATIONS[token])
+            continue
+        if token in STOP_WORDS:
+            continue
+        tokens.append(stem(token) if use_stemming else token)
+    return tokens
+
+
+def _replace_file(path, write):
+    # Never truncate in place: other workers may have the old file memory-mapped
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class InvertedIndex:
+    """BM25 over postings lists with precomputed IDF
+
+    Postings are stored CSR-style: term t owns postings_docs/postings_tfs in
+    [postings_offsets[t], postings_offsets[t + 1]). A query only touches the
+    postings of its own terms instead of scoring every document.
+    """
+
+    def __init__(self, vocab, arrays, avgdl, version=None):
+        self.vocab = vocab
+        self.postings_offsets = arrays['postings_offsets']
+        self.postings_docs = arrays['postings_docs']
+        self.postings_tfs = arrays['postings_tfs']
+        self.idf = arrays['idf']
+        self.doc_len = arrays['doc_len']
+        self.avgdl = avgdl
+        self.version = version
+
+    @property
+    def num_docs(self):
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, documents, version=None):
+        term_ids = {}
+        postings = []
+        doc_len = np.zeros(len(documents), dtype=np.int32)
+
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document)
+            doc_len[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_id = term_ids.setdefault(token, len(term_ids))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_id, tf))
+
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in postings])
+        docs = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=offsets[-1])
+        tfs = np.fromiter((tf for p in postings for _, tf in p), dtype=np.float32, count=offsets[-1])
+
+        # Okapi IDF with rank_bm25's floor for terms present in over half the corpus
+        n = len(documents)
+        df = np.diff(offsets).astype(np.float64)
+        idf = np.log(n - df + 0.5) - np.log(df + 0.5)
+        floor = EPSILON * idf.mean() if len(idf) else 0.0
+        idf[idf < 0] = floor
+
+        arrays = {
+            'postings_offsets': offsets,
+            'postings_docs': docs,
+            'postings_tfs': tfs,
+            'idf': idf.astype(np.float32),
+            'doc_len': doc_len
+        }
+        avgdl = float(doc_len.mean()) if n else 0.0
+        return cls(term_ids, arrays, avgdl, version)
+
+    def search(self, query, top_k=5):
+        """Return [(doc_id, score)] for the best-scoring documents containing any query term"""
+        # A repeated query term counts once per occurrence, as in rank_bm25
+        term_ids = [self.vocab[t] for t in tokenize(query) if t in self.vocab]
+        if not term_ids:
+            return []
+
+        doc_parts, score_parts = [], []
+        for term_id in term_ids:
+            start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+            docs = np.asarray(self.postings_docs[start:end])
+            tfs = np.asarray(self.postings_tfs[start:end])
+            norm = K1 * (1 - B + B * self.doc_len[docs] / self.avgdl)
+            doc_parts.append(docs)
+            score_parts.append(self.idf[term_id] * tfs * (K1 + 1) / (tfs + norm))
+
+        candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        top_k = min(top_k, len(candidates))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(candidates[i]), float(scores[i])) for i in best]
+
+    def save(self, index_dir):
+        os.makedirs(index_dir, exist_ok=True)
+        # meta.json is written last and marks the index as complete
+        meta_path = os.path.join(index_dir, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in _ARRAYS:
+            _replace_file(os.path.join(index_dir, f"{name}.npy"), lambda f, name=name: np.save(f, getattr(self, name)))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        meta = json.dumps({'version': self.version, 'avgdl': self.avgdl, 'terms': terms})
+        _replace_file(meta_path, lambda f: f.write(meta.encode('utf-8')))
+
+    @classmethod
+    def load(cls, index_dir):
+        with open(os.path.join(index_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        # Memory-mapped so workers sharing a bundle also share the postings
+        arrays = {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r') for name in _ARRAYS}
+        vocab = {term: i for i, term in enumerate(meta['terms'])}
+        return cls(vocab, arrays, meta['avgdl'], meta['version'])
+
+
+def load_or_build(documents, version, index_dir):
+    """Load the persisted index when it matches the bundle version, otherwise rebuild and save"""
+    version = f"{version}:tok{TOKENIZER_VERSION}"
+    meta_path = os.path.join(index_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            saved_version = json.load(f).get('version')
+        if saved_version == version:
+            with span('bm25_load'):
+                return InvertedIndex.load(index_dir)
+
+    with span('bm25_build', documents=len(documents)):
+        index = InvertedIndex.build(documents, version)
+    try:
+        index.save(index_dir)
+    except OSError as e:
+        print(f"⚠️ Could not persist BM25 index to {index_dir}: {e}")
+    return index
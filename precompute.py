@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import argparse
+import fcntl
+import threading
+from contextlib import contextmanager
+
+from rag_pipeline import (PROMPT_VERSION, rag_answer_smart, normalize_query,
+                          ADAPTIVE_MIN_RELEVANCE, ADAPTIVE_SCORE_WINDOW, ADAPTIVE_MIN_GAP)
+from instrumentation import record_cache
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'precomputed_answers.json')
+
+
+class PrecomputedStore:
+    """Answers for curated prompts, valid for one index bundle + prompt template version
+
+    Answers are built with one retrieval setting (top_k, adaptive and the adaptive
+    selection thresholds) and only served to queries run with the same setting.
+    Worker processes share the file: refreshes are serialised by a lock file and
+    each worker picks up the others' answers when the file changes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("RAG_PRECOMPUTED_PATH", DEFAULT_STORE_PATH)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = self._load()
+        self.refreshing = False
+
+    def _load(self):
+        try:
+            self._mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'index_version': None, 'prompt_version': None, 'top_k': None, 'adaptive': None,
+                    'selection': None, 'entries': {}}
+
+    def _reload_if_changed(self):
+        # Another worker may have written the file; a stat per lookup is cheap
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._data = self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        # Only one process generates at a time; the others then find the work done
+        with open(f"{self.path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        # Write-then-rename so concurrent readers never see a half-written file
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def is_current(self, index_version, prompt_version=PROMPT_VERSION):
+        return (self._data['index_version'] == index_version
+                and self._data['prompt_version'] == prompt_version)
+
+    @staticmethod
+    def _selection(adaptive):
+        # The thresholds decide which records reach an adaptive prompt, so they version it too
+        return [ADAPTIVE_MIN_RELEVANCE, ADAPTIVE_SCORE_WINDOW, ADAPTIVE_MIN_GAP] if adaptive else None
+
+    def _same_settings(self, top_k, adaptive):
+        return (self._data['top_k'] == top_k
+                and self._data.get('adaptive') == adaptive
+                and self._data.get('selection') == self._selection(adaptive))
+
+    def missing_prompts(self, queries, index_version, top_k, adaptive=False):
+        """Queries that have no answer valid for the given versions and settings"""
+        if not self.is_current(index_version) or not self._same_settings(top_k, adaptive):
+            return list(queries)
+        return [q for q in queries if normalize_query(q) not in self._data['entries']]
+
+    def lookup(self, query, index_version, top_k, adaptive=False):
+        """Return (answer, sources, mode) for a precomputed prompt built with these settings, or None"""
+        with self._lock:
+            self._reload_if_changed()
+            if not self.is_current(index_version) or not self._same_settings(top_k, adaptive):
+                entry = None
+            else:
+                entry = self._data['entries'].get(normalize_query(query))
+        record_cache('precomputed', entry is not None)
+        if entry is None:
+            return None
+        return entry['answer'], entry['sources'], entry['mode']
+
+    def refresh(self, queries, rag, generation_model, top_k=3, adaptive=False, force=False):
+        """Generate answers for stale or missing prompts and persist them"""
+        with self._file_lock():
+            with self._lock:
+                # Whoever held the lock before us may already have done this work
+                self._reload_if_changed()
+            pending = list(queries) if force else self.missing_prompts(queries, rag.index_version, top_k, adaptive)
+            if not pending:
+                return 0
+
+            with self._lock:
+                if force or not self.is_current(rag.index_version) or not self._same_settings(top_k, adaptive):
+                    self._data = {
+                        'index_version': rag.index_version,
+                        'prompt_version': PROMPT_VERSION,
+                        'top_k': top_k,
+                        'adaptive': adaptive,
+                        'selection': self._selection(adaptive),
+                        'entries': {}
+                    }
+
+            for query in pending:
+                start_time = time.time()
+                answer, sources, mode = rag_answer_smart(query, rag, generation_model, top_k=top_k, adaptive=adaptive)
+                with self._lock:
+                    self._data['entries'][normalize_query(query)] = {
+                        'query': query,
+                        'answer': answer,
+                        'sources': sources,
+                        'mode': mode,
+                        'generation_time': round(time.time() - start_time, 3),
+                        'generated_at': time.time()
+                    }
+                    # Save after every answer so a crash mid-refresh keeps finished work
+                    self._save()
+                print(f"💾 Precomputed: {query[:60]}...")
+            return len(pending)
+
+    def start_background_refresh(self, queries, rag, generation_model, top_k=3, adaptive=False):
+        """Refresh stale entries on a daemon thread; lookups keep serving current ones"""
+        if self.refreshing or not self.missing_prompts(queries, rag.index_version, top_k, adaptive):
+            return None
+
+        def run():
+            self.refreshing = True
+            try:
+                self.refresh(queries, rag, generation_model, top_k=top_k, adaptive=adaptive)
+            except Exception as e:
+                print(f"⚠️ Precompute refresh failed: {type(e).__name__}: {e}")
+            finally:
+                self.refreshing = False
+
+        thread = threading.Thread(target=run, name='precompute-refresh', daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute answers for the showcase prompts")
+    parser.add_argument('--top-k', type=int, default=3, help="Documents per answer (must match the UI default to be served)")
+    parser.add_argument('--adaptive', action=argparse.BooleanOptionalAction, default=True,
+                        help="Build answers with adaptive retrieval, like the UI default (--no-adaptive to disable)")
+    parser.add_argument('--force', action='store_true', help="Regenerate every answer even if the store is current")
+    parser.add_argument('--path', default=None, help="Store location (defaults to RAG_PRECOMPUTED_PATH or precomputed_answers.json)")
+    args = parser.parse_args()
+
+    from retrieval_system import get_rag_system
+    from api_config import configure_gemini
+    from showcase import SHOWCASE_PROMPTS
+
+    store = PrecomputedStore(args.path)
+    queries = [p['query'] for p in SHOWCASE_PROMPTS.values()]
+    count = store.refresh(queries, get_rag_system(), configure_gemini(), top_k=args.top_k, adaptive=args.adaptive, force=args.force)
+    print(f"✅ {count} answers generated, store at {store.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import random
+import pstats
+import cProfile
+import itertools
+import contextvars
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from instrumentation import span, active_trace_ids
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+SAMPLE_INTERVAL = 0.005
+_sequence = itertools.count()
+# Profilers from pipeline stages of the request being profiled (carried into worker threads)
+_stage_profiles = contextvars.ContextVar('rag_stage_profiles', default=None)
+
+# Frames a thread sits in while it has nothing to do; such samples are dropped
+IDLE_FUNCTIONS = {
+    ('threading.py', 'wait'), ('selectors.py', 'select'), ('queue.py', 'get'),
+    ('thread.py', '_worker'), ('socketserver.py', 'serve_forever'), ('base_events.py', '_run_once')
+}
+
+
+def profiling_enabled(flag=None):
+    """Profile when asked per request, or for RAG_PROFILE=1 / a RAG_PROFILE_SAMPLE fraction of requests"""
+    if flag:
+        return True
+    if os.getenv("RAG_PROFILE") == "1":
+        return True
+    sample_rate = float(os.getenv("RAG_PROFILE_SAMPLE", "0"))
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def profiled_call(fn, *args):
+    """Run a pipeline stage under cProfile when its request is being profiled"""
+    profiles = _stage_profiles.get()
+    if profiles is None:
+        return fn(*args)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler already owns this thread; the stack samples still cover it
+        return fn(*args)
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        profiles.append(profiler)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Sample Python stacks at a fixed interval into folded-stack counts
+
+    Unlike cProfile this sees work handed to other threads (the async pipeline's
+    to_thread stages, FAISS shard searches), and its output feeds flamegraph.pl
+    or speedscope directly. With a trace_id, only the given threads and threads
+    currently inside a span of that trace are sampled, so concurrent requests from
+    other sessions stay out of the profile; without one every thread is sampled.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, trace_id=None, thread_ids=()):
+        self.interval = interval
+        self.trace_id = trace_id
+        self.thread_ids = set(thread_ids)
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            traces = active_trace_ids() if self.trace_id else {}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.trace_id and thread_id not in self.thread_ids and traces.get(thread_id) != self.trace_id:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _rotate(profile_dir, keep):
+    # Each request writes a .pstats/.folded pair; drop the oldest beyond `keep` requests.
+    # Concurrent profiled requests rotate the same directory, so files may vanish underneath us
+    files = []
+    for name in os.listdir(profile_dir):
+        if name.endswith(('.pstats', '.folded')):
+            path = os.path.join(profile_dir, name)
+            try:
+                files.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+    files.sort()
+    for _, path in files[:max(0, len(files) - keep * 2)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_profile(prefix, profilers, sampler, profile_dir):
+    # Profiling must never fail the request it measured
+    try:
+        if profilers:
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(f"{prefix}.pstats")
+        sampler.write_folded(f"{prefix}.folded")
+        _rotate(profile_dir, int(os.getenv("RAG_PROFILE_KEEP", "50")))
+        written = "pstats,folded" if profilers else "folded"
+        print(f"🔬 Profile written to {prefix}.{{{written}}}")
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️ Could not write profile {prefix}: {e}")
+
+
+@contextmanager
+def profile_request(name, enabled=None, all_threads=False, profile_caller=True):
+    """Capture cProfile stats and stack samples for one request
+
+    Writes <name>-<timestamp>.pstats (open with `python -m pstats` or snakeviz) and
+    a matching .folded file (`flamegraph.pl x.folded > x.svg`) into RAG_PROFILE_DIR,
+    keeping the newest RAG_PROFILE_KEEP requests. The .pstats merges cProfile runs
+    of the calling thread (unless profile_caller=False, for callers that only wait
+    on a future) and of every async pipeline stage started inside the block.
+    Stack samples cover the calling thread and worker threads running this
+    request's stages; all_threads=True samples the whole process instead (used for
+    batch runs, whose worker pool does not share the caller's trace). Yields the
+    output path prefix, or None when profiling is off.
+    """
+    if not profiling_enabled(enabled):
+        yield None
+        return
+
+    profile_dir = os.getenv("RAG_PROFILE_DIR", DEFAULT_PROFILE_DIR)
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+    except OSError as e:
+        print(f"⚠️ Profiling skipped, cannot create {profile_dir}: {e}")
+        yield None
+        return
+    prefix = os.path.join(profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}")
+
+    profilers = []
+    token = _stage_profiles.set(profilers)
+    # Pipeline stages started inside this block run in the profile span's trace, which
+    # is how the sampler recognises this request's work on shared worker threads
+    with span('profile', profile=os.path.basename(prefix)) as root:
+        caller_profiler = None
+        if profile_caller:
+            caller_profiler = cProfile.Profile()
+            try:
+                caller_profiler.enable()
+            except ValueError:
+                # Another profiler already owns this thread (e.g. a nested request); keep the stack samples only
+                caller_profiler = None
+        sampler = StackSampler(
+            trace_id=None if all_threads else root['trace_id'],
+            thread_ids=[threading.get_ident()]
+        ).start()
+        try:
+            yield prefix
+        finally:
+            sampler.stop()
+            _stage_profiles.reset(token)
+            if caller_profiler is not None:
+                caller_profiler.disable()
+                profilers.insert(0, caller_profiler)
+            _write_profile(prefix, list(profilers), sampler, profile_dir)
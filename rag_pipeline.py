@@ -0,0 +1,153 @@
+import os
+import hashlib
+
+from instrumentation import span, inc, observe, record_generation_tokens
+
+RELEVANCE_THRESHOLD = 0.3
+DOC_PREVIEW_CHARS = 500
+
+# Adaptive retrieval. Embeddings are unit-normalized and similarity is 1 / (1 + squared L2),
+# so scores run from 0.2 (opposite) to 1.0 (identical); unrelated text lands around 0.36.
+# 0.4 corresponds to a cosine of 0.25, the point where records start sharing real content.
+ADAPTIVE_MIN_RELEVANCE = float(os.getenv("RAG_MIN_RELEVANCE", "0.4"))
+ADAPTIVE_SCORE_WINDOW = 0.08   # keep documents within this distance of the best match
+ADAPTIVE_MIN_GAP = 0.03        # a drop this large between neighbours ends the context
+CONTEXT_DOC_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10)
+
+GENERAL_KNOWLEDGE_TEMPLATE = """MEDICAL QUESTION: {query}
+
+You are a medical expert. Provide accurate, evidence-based information.
+Answer comprehensively with proper medical terminology and structure your response with clear sections."""
+
+RECORDS_TEMPLATE = """You are a medical analyst with access to patient records. Provide comprehensive analysis.
+
+QUESTION: {query}
+
+PATIENT RECORDS:
+{context}
+
+INSTRUCTIONS:
+1. Analyze what the patient records reveal
+2. Identify patterns and correlations
+3. Supplement with general medical knowledge where appropriate
+4. Always cite specific documents (Document 1, 2, etc.)
+5. Structure response with clear sections and bullet points
+6. Include: "Analysis based on {num_docs} patient records and medical literature"
+
+COMPREHENSIVE ANALYSIS:"""
+
+CONVERSATION_TEMPLATE = """CONVERSATION SO FAR:
+{history}
+
+Treat the next question as a follow-up to this conversation.
+
+{prompt}"""
+
+# Changes whenever a template or the context formatting rules change
+PROMPT_VERSION = hashlib.sha1(
+    f"{GENERAL_KNOWLEDGE_TEMPLATE}|{RECORDS_TEMPLATE}|{RELEVANCE_THRESHOLD}|{DOC_PREVIEW_CHARS}".encode('utf-8')
+).hexdigest()[:12]
+
+
+def normalize_query(query):
+    """Collapse case and whitespace so trivially different spellings share an entry"""
+    return " ".join(query.lower().split())
+
+
+def format_context(retrieved):
+    """Render retrieved documents as numbered, truncated context blocks"""
+    ctx_formatted = []
+    for i, r in enumerate(retrieved):
+        doc_preview = r['document'][:DOC_PREVIEW_CHARS] + "..." if len(r['document']) > DOC_PREVIEW_CHARS else r['document']
+        ctx_formatted.append(f"[Document {i+1}, Relevance: {r['similarity']:.3f}]:\n{doc_preview}")
+    return "\n\n".join(ctx_formatted)
+
+
+def build_prompt(query, retrieved):
+    """Pick record-based or general-knowledge prompt from retrieval relevance"""
+    all_low_relevance = all(r['similarity'] < RELEVANCE_THRESHOLD for r in retrieved) if retrieved else True
+
+    if all_low_relevance and retrieved:
+        return GENERAL_KNOWLEDGE_TEMPLATE.format(query=query), "general_knowledge"
+
+    prompt = RECORDS_TEMPLATE.format(
+        query=query,
+        context=format_context(retrieved),
+        num_docs=len(retrieved)
+    )
+    return prompt, "rag_with_supplement"
+
+
+def select_adaptive(retrieved, min_relevance=ADAPTIVE_MIN_RELEVANCE,
+                    window=ADAPTIVE_SCORE_WINDOW, min_gap=ADAPTIVE_MIN_GAP):
+    """Choose how many retrieved documents are worth sending from their score distribution
+
+    Documents below the calibrated bar are dropped, then those far behind the best
+    match, then everything after the largest score gap. Returns (kept, decision);
+    the decision's `reason` names every cut that actually removed documents
+    (e.g. "relevance_bar+score_gap"), and `dropped` counts them per cut.
+    """
+    decision = {
+        'candidates': len(retrieved),
+        'top_similarity': retrieved[0]['similarity'] if retrieved else None
+    }
+
+    kept = [r for r in retrieved if r['similarity'] >= min_relevance]
+    if not kept:
+        decision.update(kept=0, reason='below_relevance_bar', dropped={'relevance_bar': len(retrieved)})
+        return [], decision
+    dropped = {'relevance_bar': len(retrieved) - len(kept)}
+
+    best = kept[0]['similarity']
+    in_window = [r for r in kept if best - r['similarity'] <= window]
+    dropped['score_window'] = len(kept) - len(in_window)
+    kept = in_window
+
+    drops = [kept[i]['similarity'] - kept[i + 1]['similarity'] for i in range(len(kept) - 1)]
+    dropped['score_gap'] = 0
+    if drops and max(drops) >= min_gap:
+        dropped['score_gap'] = len(kept) - (drops.index(max(drops)) + 1)
+        kept = kept[:drops.index(max(drops)) + 1]
+
+    reason = "+".join(cut for cut, count in dropped.items() if count) or 'all_relevant'
+    decision.update(kept=len(kept), reason=reason, dropped=dropped, cut_similarity=kept[-1]['similarity'])
+    return kept, decision
+
+
+def build_adaptive_prompt(query, retrieved):
+    """Adaptive variant of build_prompt; returns (prompt, mode, context_docs, decision)"""
+    kept, decision = select_adaptive(retrieved)
+    inc('rag_adaptive_decisions_total', reason=decision['reason'])
+    observe('rag_context_documents', len(kept), buckets=CONTEXT_DOC_BUCKETS)
+
+    if not kept:
+        # Nothing clears the bar: skip record context entirely
+        return GENERAL_KNOWLEDGE_TEMPLATE.format(query=query), "general_knowledge", [], decision
+    prompt, mode = build_prompt(query, kept)
+    return prompt, mode, kept, decision
+
+
+def with_history(prompt, history):
+    """Prefix a prompt with the condensed conversation, if there is one"""
+    if not history:
+        return prompt
+    return CONVERSATION_TEMPLATE.format(history=history, prompt=prompt)
+
+
+def rag_answer_smart(query, rag, generation_model, top_k=3, adaptive=False):
+    """Advanced RAG with intelligent fallback; with adaptive=True top_k is an upper bound"""
+    with span('retrieve', top_k=top_k):
+        retrieved = rag.retrieve_with_scores(query, top_k=top_k)
+    with span('prompt_build') as s:
+        if adaptive:
+            prompt, mode, retrieved, decision = build_adaptive_prompt(query, retrieved)
+            s['attributes'].update(decision)
+        else:
+            prompt, mode = build_prompt(query, retrieved)
+        s['attributes'].update(mode=mode, prompt_chars=len(prompt))
+
+    with span('generate') as s:
+        response = generation_model.generate_content(prompt)
+        prompt_tokens, output_tokens = record_generation_tokens(response, prompt)
+        s['attributes'].update(prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+    return response.text, retrieved, mode
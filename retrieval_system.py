@@ -1,55 +1,150 @@
 import os
 import pickle
+import threading
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
+from instrumentation import span
+from shared_index import bundle_version, load_shared_bundle, load_shared_shards
+from sharded_index import build_sharded_index, configured_shard_count
+from lexical_index import load_or_build, LEXICAL_INDEX_DIR
 
 class MedicalRAGSystem:
-    def __init__(self):
+    def __init__(self, shared_bundle=None):
         print("🚀 Loading Medical RAG System...")
         
         # Get the directory where this script is located
         current_dir = os.path.dirname(os.path.abspath(__file__))
         
-        # Load documents with absolute path
-        documents_path = os.path.join(current_dir, 'documents.pkl')
-        with open(documents_path, 'rb') as f:
-            self.documents = pickle.load(f)
+        shared_bundle = shared_bundle or os.getenv("RAG_SHARED_BUNDLE")
+        if shared_bundle:
+            # Attach read-only to the bundle a loader placed in shared memory
+            self.documents, self.embeddings, self.index, manifest = load_shared_bundle(shared_bundle)
+            self.index_version = manifest['index_version']
+            print(f"🔗 Attached to shared bundle at {shared_bundle}")
+        else:
+            # Load documents with absolute path
+            documents_path = os.path.join(current_dir, 'documents.pkl')
+            with open(documents_path, 'rb') as f:
+                self.documents = pickle.load(f)
+            
+            # Load embeddings with absolute path
+            embeddings_path = os.path.join(current_dir, 'embeddings.npy')
+            self.embeddings = np.load(embeddings_path)
+            
+            # faiss and torch are imported here rather than at module level so importing this
+            # module (and the app) stays cheap; the cost is paid once, when the system is built
+            import faiss
+            
+            # Load FAISS index with absolute path
+            faiss_path = os.path.join(current_dir, 'faiss_index.faiss')
+            self.index = faiss.read_index(faiss_path)
+            
+            self.index_version = bundle_version(current_dir)
         
-        # Load embeddings with absolute path
-        embeddings_path = os.path.join(current_dir, 'embeddings.npy')
-        self.embeddings = np.load(embeddings_path)
+        num_shards = configured_shard_count()
+        if num_shards > 1 and shared_bundle:
+            # Rebuilding shards here would give every worker a private copy of the vectors
+            sharded = load_shared_shards(shared_bundle, manifest, num_shards)
+            if sharded is not None:
+                self.index = sharded
+                print(f"🧩 Mapped {num_shards} shards from the shared bundle")
+            else:
+                print(f"⚠️ Shared bundle has {manifest.get('num_shards', 1)} shard(s), not {num_shards}; "
+                      f"searching its single index. Re-export with `--shards {num_shards}` to shard.")
+        elif num_shards > 1:
+            # The loaded index is the source of truth for the vectors each shard holds
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+            self.index = build_sharded_index(self.documents, vectors, num_shards)
+            print(f"🧩 Split index into {num_shards} shards")
         
-        # Load FAISS index with absolute path
-        faiss_path = os.path.join(current_dir, 'faiss_index.faiss')
-        self.index = faiss.read_index(faiss_path)
+        # Initialize BM25 (persisted next to the bundle, rebuilt only when the bundle changes)
+        bm25_dir = os.path.join(shared_bundle or current_dir, LEXICAL_INDEX_DIR)
+        self.bm25 = load_or_build(self.documents, self.index_version, bm25_dir)
         
-        # Initialize BM25
-        tokenized_docs = [doc.split() for doc in self.documents]
-        self.bm25 = BM25Okapi(tokenized_docs)
-        
-        # Load embedding model
+        # Load embedding model (one per worker; the only large private allocation in shared mode)
+        from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer('all-MiniLM-L6-v2')
         
         print(f"✅ System loaded: {len(self.documents)} documents, {self.embeddings.shape[1]}D embeddings")
     
+    def encode_query(self, query):
+        """Embed a query into the index's vector space"""
+        with span('encode'):
+            return self.model.encode([query]).astype('float32')
+    
     def retrieve_with_scores(self, query, top_k=5):
         """Retrieve documents with similarity scores"""
-        q_emb = self.model.encode([query]).astype('float32')
-        distances, idx = self.index.search(q_emb, top_k)
+        return self.search_by_embedding(self.encode_query(query), top_k=top_k)
+    
+    def search_by_embedding(self, q_emb, top_k=5):
+        """Retrieve documents for an already-encoded query"""
+        with span('search', top_k=top_k):
+            distances, idx = self.index.search(q_emb, top_k)
         
+        return self._rank_results(idx[0], distances[0])
+    
+    def retrieve_batch(self, queries, top_k=5):
+        """Retrieve for many queries with one encoder pass and one index search"""
+        with span('encode', batch=len(queries)):
+            q_embs = self.model.encode(queries).astype('float32')
+        with span('search', top_k=top_k, batch=len(queries)):
+            distances, idx = self.index.search(q_embs, top_k)
+        
+        return [self._rank_results(row_idx, row_dist) for row_idx, row_dist in zip(idx, distances)]
+    
+    def _rank_results(self, doc_ids, distances):
         results = []
-        for i, (doc_idx, distance) in enumerate(zip(idx[0], distances[0])):
+        for i, (doc_idx, distance) in enumerate(zip(doc_ids, distances)):
             if doc_idx != -1 and doc_idx < len(self.documents):
                 similarity = 1 / (1 + distance)
                 results.append({
                     'rank': i + 1,
+                    'doc_id': int(doc_idx),
                     'document': self.documents[doc_idx],
                     'similarity': round(float(similarity), 4)
                 })
         
         return results
+    
+    def score_documents(self, q_emb, doc_ids):
+        """Score specific documents against a query embedding on the same scale as search"""
+        vectors = np.asarray(self.embeddings[list(doc_ids)], dtype='float32')
+        distances = ((vectors - q_emb[0]) ** 2).sum(axis=1)
+        
+        scored = sorted(zip(doc_ids, distances), key=lambda item: item[1])
+        return [{
+            'rank': i + 1,
+            'doc_id': int(doc_idx),
+            'document': self.documents[doc_idx],
+            'similarity': round(float(1 / (1 + distance)), 4)
+        } for i, (doc_idx, distance) in enumerate(scored)]
+    
+    def keyword_search(self, query, top_k=5):
+        """Retrieve documents by BM25 keyword score"""
+        with span('bm25_search', top_k=top_k):
+            hits = self.bm25.search(query, top_k=top_k)
+        
+        return [{
+            'rank': i + 1,
+            'doc_id': doc_idx,
+            'document': self.documents[doc_idx],
+            'bm25_score': round(score, 4)
+        } for i, (doc_idx, score) in enumerate(hits)]
+
+_rag_system = None
+_rag_system_lock = threading.Lock()
+
+
+def get_rag_system():
+    """Process-wide MedicalRAGSystem, built on first use"""
+    global _rag_system
+    with _rag_system_lock:
+        if _rag_system is None:
+            _rag_system = MedicalRAGSystem()
+    return _rag_system
+
 
-# Global instance
-rag_system = MedicalRAGSystem()
+def __getattr__(name):
+    # Keeps `from retrieval_system import rag_system` working without building at import time
+    if name == 'rag_system':
+        return get_rag_system()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
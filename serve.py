@@ -0,0 +1,28 @@
+import os
+import sys
+
+from status_server import start_status_server
+from warmup import start_backend
+from instrumentation import start_metrics_file_exporter
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def main():
+    """Start the status server and warm-up, then run the Streamlit app in this same process
+
+    Streamlit only executes app.py when a browser connects, so anything started
+    from the script would wait for the first visitor. Usage:
+    `python serve.py [streamlit run options]`, e.g. `python serve.py --server.port 8501`.
+    """
+    start_status_server()
+    start_metrics_file_exporter()
+    start_backend()
+
+    from streamlit.web import cli as stcli
+    sys.argv = ['streamlit', 'run', APP_PATH] + sys.argv[1:]
+    sys.exit(stcli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import re
+from collections import deque
+import numpy as np
+
+from instrumentation import inc
+
+FOLLOW_UP_MAX_WORDS = 12
+# Cosine similarity above which a new query is treated as continuing the last topic
+FOLLOW_UP_COSINE = 0.5
+# Lower bar for short queries with a pronoun mid-sentence ("what dose did they get");
+# "is it common for migraine to cause nausea" is a new question despite its "it"
+ANAPHORA_COSINE = 0.35
+ANSWER_SUMMARY_CHARS = 240
+
+# Openers that only make sense as a continuation ("what about their medications?")
+FOLLOW_UP_OPENER = re.compile(
+    r"^(what about|how about|and|also|then|what else|same for"
+    r"|they|them|their|those|these|he|she|his|her)\b"
+)
+ANAPHORA_PATTERN = re.compile(r"\b(they|them|their|theirs|those|these|that|this|it|its|he|she|his|her)\b")
+
+
+class ConversationSession:
+    """Per-user multi-turn state with bounded memory
+
+    Keeps the last few turns (query, query embedding, retrieved doc ids and a
+    short answer summary). Documents are referenced by id only; their vectors
+    stay in the shared embeddings array, so a session costs a few KB.
+    """
+
+    def __init__(self, max_turns=6, max_cached_docs=20):
+        self.turns = deque(maxlen=max_turns)
+        self.max_cached_docs = max_cached_docs
+
+    def __len__(self):
+        return len(self.turns)
+
+    def clear(self):
+        self.turns.clear()
+
+    def cached_doc_ids(self):
+        """Distinct doc ids from recent turns, newest first, capped at max_cached_docs"""
+        seen = []
+        for turn in reversed(self.turns):
+            for doc_id in turn['doc_ids']:
+                if doc_id not in seen:
+                    seen.append(doc_id)
+        return seen[:self.max_cached_docs]
+
+    def is_follow_up(self, query, q_emb):
+        """Short queries opening with a continuation, or ones close enough to the previous query"""
+        if not self.turns:
+            return False
+        query_lower = query.lower().strip()
+        short = len(query_lower.split()) <= FOLLOW_UP_MAX_WORDS
+        if short and FOLLOW_UP_OPENER.search(query_lower):
+            return True
+        previous = self.turns[-1]['embedding']
+        if previous is None:
+            return False
+        cosine = float(np.dot(q_emb[0], previous) / (np.linalg.norm(q_emb[0]) * np.linalg.norm(previous) + 1e-8))
+        # A pronoun alone is weak evidence; it also has to stay near the previous topic
+        if short and ANAPHORA_PATTERN.search(query_lower):
+            return cosine >= ANAPHORA_COSINE
+        return cosine >= FOLLOW_UP_COSINE
+
+    def topic_embedding(self, q_emb):
+        """Blend the follow-up with the previous query so "their medications" keeps its subject"""
+        previous = self.turns[-1]['embedding']
+        if previous is None:
+            return q_emb
+        blended = q_emb[0] + previous
+        blended /= np.linalg.norm(blended) + 1e-8
+        return blended[np.newaxis, :].astype('float32')
+
+    def retrieve(self, rag, query, top_k, min_relevance):
+        """Session-aware dense retrieval; returns (results, how, query embedding)
+
+        Follow-ups are first scored against documents already retrieved in this
+        session; a fresh index search only happens if none of them is relevant.
+        """
+        q_emb = rag.encode_query(query)
+        if not self.is_follow_up(query, q_emb):
+            return rag.search_by_embedding(q_emb, top_k=top_k), 'new_topic', q_emb
+
+        topic_emb = self.topic_embedding(q_emb)
+        cached_ids = self.cached_doc_ids()
+        if cached_ids:
+            reused = rag.score_documents(topic_emb, cached_ids)[:top_k]
+            if reused and reused[0]['similarity'] >= min_relevance:
+                inc('rag_session_retrievals_total', source='reused')
+                return reused, 'reused', q_emb
+
+        inc('rag_session_retrievals_total', source='searched')
+        return rag.search_by_embedding(topic_emb, top_k=top_k), 'follow_up_search', q_emb
+
+    def record_turn(self, query, q_emb, answer, sources):
+        self.turns.append({
+            'query': query,
+            # None when the answer came from the precomputed store without encoding
+            'embedding': np.asarray(q_emb[0], dtype='float32') if q_emb is not None else None,
+            'doc_ids': [s['doc_id'] for s in sources if s.get('doc_id') is not None],
+            'answer_summary': " ".join(answer.split())[:ANSWER_SUMMARY_CHARS]
+        })
+
+    def condensed_history(self, max_turns=3):
+        """Compact transcript of the latest turns for the prompt"""
+        lines = []
+        for turn in list(self.turns)[-max_turns:]:
+            lines.append(f"Q: {turn['query']}")
+            lines.append(f"A (summary): {turn['answer_summary']}...")
+        return "\n".join(lines)
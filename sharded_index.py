@@ -0,0 +1,105 @@
+import os
+import zlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from instrumentation import call_in_trace
+
+
+def record_hash_key(doc_id, document):
+    """Stable shard key from the record text (Python's hash() is salted per process)"""
+    return zlib.crc32(document.encode('utf-8'))
+
+
+def assign_shards(documents, num_shards, key=record_hash_key):
+    """Global document ids for each shard; `key` may read metadata instead of hashing text"""
+    assignments = [[] for _ in range(num_shards)]
+    for doc_id, document in enumerate(documents):
+        assignments[key(doc_id, document) % num_shards].append(doc_id)
+    return [np.asarray(ids, dtype=np.int64) for ids in assignments]
+
+
+class LocalShard:
+    """One partition held in this process
+
+    Any object with the same `search(q_emb, k) -> (distances, global_ids)` and
+    `ntotal` can stand in for a shard on another node.
+    """
+
+    def __init__(self, shard_id, doc_ids, vectors=None, index=None):
+        self.shard_id = shard_id
+        self.doc_ids = doc_ids
+        if index is None:
+            import faiss
+            index = faiss.IndexFlatL2(vectors.shape[1])
+            if len(doc_ids):
+                index.add(np.ascontiguousarray(vectors, dtype='float32'))
+        # A prebuilt index may be a read-only mapping of a shard file in a shared bundle
+        self.index = index
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    def search(self, q_emb, k):
+        k = min(k, self.ntotal)
+        if k == 0:
+            return np.empty((len(q_emb), 0), dtype='float32'), np.empty((len(q_emb), 0), dtype=np.int64)
+        distances, local_ids = self.index.search(q_emb, k)
+        global_ids = np.where(local_ids >= 0, self.doc_ids[np.maximum(local_ids, 0)], -1)
+        return distances, global_ids
+
+
+class ShardedIndex:
+    """Scatter a query to every shard in parallel and merge the per-shard top-k
+
+    Shards are exact L2 indexes over the same embedding space, so raw distances
+    are directly comparable and the merged top-k equals a single flat search.
+    Exposes the subset of the FAISS index API used by MedicalRAGSystem.
+    """
+
+    def __init__(self, shards, max_workers=None):
+        self.shards = shards
+        # FAISS releases the GIL during search, so threads give real parallelism
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(shards), thread_name_prefix='shard-search')
+
+    @property
+    def ntotal(self):
+        return sum(shard.ntotal for shard in self.shards)
+
+    def search(self, q_emb, k):
+        # Carry the caller's trace to the pool threads so profiles attribute shard searches
+        futures = [
+            self._pool.submit(contextvars.copy_context().run, call_in_trace, shard.search, q_emb, k)
+            for shard in self.shards
+        ]
+        parts = [f.result() for f in futures]
+
+        distances = np.concatenate([d for d, _ in parts], axis=1)
+        ids = np.concatenate([i for _, i in parts], axis=1)
+        distances = np.where(ids >= 0, distances, np.inf)
+
+        nq = len(q_emb)
+        out_d = np.full((nq, k), np.inf, dtype='float32')
+        out_i = np.full((nq, k), -1, dtype=np.int64)
+        for row in range(nq):
+            # Sort by distance, then by global id so ties break like a single flat index
+            order = np.lexsort((ids[row], distances[row]))[:k]
+            out_d[row, :len(order)] = distances[row, order]
+            out_i[row, :len(order)] = ids[row, order]
+        return out_d, out_i
+
+
+def build_sharded_index(documents, vectors, num_shards, key=record_hash_key, max_workers=None):
+    """Partition documents into local shards and wrap them for scatter-gather search"""
+    shards = [
+        LocalShard(shard_id, doc_ids, vectors[doc_ids])
+        for shard_id, doc_ids in enumerate(assign_shards(documents, num_shards, key))
+    ]
+    return ShardedIndex(shards, max_workers=max_workers)
+
+
+def configured_shard_count():
+    """Number of shards from RAG_NUM_SHARDS (1 = plain single index)"""
+    return max(1, int(os.getenv("RAG_NUM_SHARDS", "1")))
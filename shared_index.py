@@ -0,0 +1,198 @@
+import os
+import json
+import pickle
+import hashlib
+import argparse
+from collections.abc import Sequence
+import numpy as np
+
+from lexical_index import load_or_build, LEXICAL_INDEX_DIR
+from sharded_index import LocalShard, ShardedIndex, assign_shards, configured_shard_count
+
+# Files a loader writes and workers map read-only
+DOCUMENTS_BLOB = 'documents.bin'
+DOCUMENT_OFFSETS = 'document_offsets.npy'
+EMBEDDINGS_FILE = 'embeddings.npy'
+INDEX_FILE = 'faiss_index.faiss'
+MANIFEST_FILE = 'bundle.json'
+SHARDS_DIR = 'shards'
+
+DEFAULT_SHARED_DIR = '/dev/shm/clinical-rag'
+
+# Source bundle produced by the notebook
+BUNDLE_FILES = ('documents.pkl', 'embeddings.npy', 'faiss_index.faiss')
+
+
+def bundle_version(bundle_dir):
+    """Content hash of the index bundle, used to invalidate anything derived from it"""
+    digest = hashlib.sha1()
+    for name in BUNDLE_FILES:
+        with open(os.path.join(bundle_dir, name), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class MappedDocuments(Sequence):
+    """Read-only document list backed by one mmap'd UTF-8 buffer
+
+    Every worker maps the same file, so the text lives once in the page cache
+    (or in tmpfs when the bundle sits under /dev/shm) instead of once per process.
+    """
+
+    def __init__(self, blob_path, offsets_path):
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+        if os.path.getsize(blob_path) == 0:
+            self._blob = np.zeros(0, dtype=np.uint8)
+        else:
+            self._blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+
+def _replace_file(path, write):
+    # Workers that already mapped the old file keep its inode; new workers see the new one
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_blob(path, encoded):
+    with open(path, 'wb') as f:
+        for b in encoded:
+            f.write(b)
+
+
+def _write_text(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def _save_npy(path, array):
+    with open(path, 'wb') as f:
+        np.save(f, array)
+
+
+def export_shared_bundle(out_dir, documents, embeddings, index, index_version, num_shards=1):
+    """Write documents, embeddings and index (plus shard indexes) as mmap-friendly files (the loader step)"""
+    import faiss
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    encoded = [doc.encode('utf-8') for doc in documents]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    _replace_file(os.path.join(out_dir, DOCUMENTS_BLOB), lambda p: _write_blob(p, encoded))
+    _replace_file(os.path.join(out_dir, DOCUMENT_OFFSETS), lambda p: _save_npy(p, offsets))
+    _replace_file(os.path.join(out_dir, EMBEDDINGS_FILE),
+                  lambda p: _save_npy(p, np.ascontiguousarray(embeddings, dtype='float32')))
+    _replace_file(os.path.join(out_dir, INDEX_FILE), lambda p: faiss.write_index(index, p))
+
+    if num_shards > 1:
+        # Workers map these instead of each rebuilding private shard indexes
+        vectors = index.reconstruct_n(0, index.ntotal)
+        shard_dir = os.path.join(out_dir, SHARDS_DIR, str(num_shards))
+        os.makedirs(shard_dir, exist_ok=True)
+        for shard_id, doc_ids in enumerate(assign_shards(documents, num_shards)):
+            shard = LocalShard(shard_id, doc_ids, vectors[doc_ids])
+            _replace_file(os.path.join(shard_dir, f"shard-{shard_id}.faiss"),
+                          lambda p: faiss.write_index(shard.index, p))
+            _replace_file(os.path.join(shard_dir, f"shard-{shard_id}.ids.npy"), lambda p: _save_npy(p, doc_ids))
+
+    # Manifest last: workers treat its presence as "bundle complete"
+    manifest = {
+        'index_version': index_version,
+        'documents': len(encoded),
+        'dimension': int(embeddings.shape[1]),
+        'num_shards': num_shards
+    }
+    _replace_file(manifest_path, lambda p: _write_text(p, json.dumps(manifest)))
+
+
+def read_index_mmap(path):
+    """Map the FAISS index read-only; fall back to a private copy if mmap is unsupported"""
+    import faiss
+    try:
+        # IO_FLAG_MMAP_IFC keeps flat index codes in the mapped file; plain IO_FLAG_MMAP
+        # still copies an IndexFlat's vectors into private memory in every worker
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except (RuntimeError, AttributeError):
+        return faiss.read_index(path)
+
+
+def load_shared_bundle(bundle_dir):
+    """Attach to a bundle written by export_shared_bundle
+
+    Returns (documents, embeddings, index, manifest); nothing is copied into
+    private memory except the FAISS fallback when mmap is unavailable.
+    """
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"❌ No shared bundle at {bundle_dir} - run `python shared_index.py export` first")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    documents = MappedDocuments(
+        os.path.join(bundle_dir, DOCUMENTS_BLOB),
+        os.path.join(bundle_dir, DOCUMENT_OFFSETS)
+    )
+    embeddings = np.load(os.path.join(bundle_dir, EMBEDDINGS_FILE), mmap_mode='r')
+    index = read_index_mmap(os.path.join(bundle_dir, INDEX_FILE))
+    return documents, embeddings, index, manifest
+
+
+def load_shared_shards(bundle_dir, manifest, num_shards):
+    """Map the bundle's shard indexes; None if it was exported with a different shard count"""
+    if manifest.get('num_shards', 1) != num_shards:
+        return None
+    shard_dir = os.path.join(bundle_dir, SHARDS_DIR, str(num_shards))
+    shards = [
+        LocalShard(
+            shard_id,
+            np.load(os.path.join(shard_dir, f"shard-{shard_id}.ids.npy"), mmap_mode='r'),
+            index=read_index_mmap(os.path.join(shard_dir, f"shard-{shard_id}.faiss"))
+        )
+        for shard_id in range(num_shards)
+    ]
+    return ShardedIndex(shards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare a shared-memory index bundle for multi-worker serving")
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('--out', default=os.getenv("RAG_SHARED_BUNDLE", DEFAULT_SHARED_DIR),
+                        help="Target directory; /dev/shm keeps it in RAM shared by all workers")
+    parser.add_argument('--shards', type=int, default=configured_shard_count(),
+                        help="Also write this many shard indexes (default: RAG_NUM_SHARDS or 1)")
+    args = parser.parse_args()
+
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(source_dir, 'documents.pkl'), 'rb') as f:
+        documents = pickle.load(f)
+    embeddings = np.load(os.path.join(source_dir, 'embeddings.npy'))
+    import faiss
+    index = faiss.read_index(os.path.join(source_dir, 'faiss_index.faiss'))
+
+    version = bundle_version(source_dir)
+    export_shared_bundle(args.out, documents, embeddings, index, version, num_shards=args.shards)
+    # Workers map the postings too instead of each rebuilding BM25
+    load_or_build(documents, version, os.path.join(args.out, LEXICAL_INDEX_DIR))
+    print(f"✅ Shared bundle written to {args.out}: {len(documents)} documents")
+
+
+if __name__ == '__main__':
+    main()
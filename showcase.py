@@ -0,0 +1,51 @@
+# Strategic prompt examples that showcase system strengths
+SHOWCASE_PROMPTS = {
+    "🔍 Multi-Patient Pattern Analysis": {
+        "query": "Analyze all patients with cardiovascular conditions and identify common risk factors, medications, and treatment outcomes across the dataset",
+        "description": "Demonstrates cross-document analysis and pattern recognition across multiple patient records",
+        "tag": "Multi-doc retrieval + Synthesis",
+        "icon": "🔍"
+    },
+    "💊 Medication Efficacy Comparison": {
+        "query": "Compare treatment approaches for atrial fibrillation patients - which medications appear most effective and what are the documented side effects?",
+        "description": "Showcases ability to extract, compare, and synthesize treatment data from multiple sources",
+        "tag": "Comparative analysis + Evidence synthesis",
+        "icon": "💊"
+    },
+    "📊 Symptom-to-Diagnosis Correlation": {
+        "query": "What are the most common symptom combinations that lead to migraine diagnosis, and how do treatment plans vary based on severity?",
+        "description": "Highlights pattern recognition and clinical correlation capabilities",
+        "tag": "Pattern detection + Clinical reasoning",
+        "icon": "📊"
+    },
+    "⚠️ Risk Factor Identification": {
+        "query": "Identify patients with diabetes who also have cardiovascular complications - what are the common risk factors and preventive measures mentioned?",
+        "description": "Demonstrates complex filtering, correlation analysis, and risk assessment",
+        "tag": "Complex queries + Risk analysis",
+        "icon": "⚠️"
+    },
+    "🧬 Comorbidity Analysis": {
+        "query": "Find patients with multiple chronic conditions and analyze how their treatment plans address drug interactions and comorbidity management",
+        "description": "Shows sophisticated multi-condition analysis and clinical decision support",
+        "tag": "Complex medical reasoning",
+        "icon": "🧬"
+    },
+    "📈 Treatment Timeline Analysis": {
+        "query": "Trace the progression of treatment for patients with hypertension - from initial diagnosis through medication adjustments to outcome",
+        "description": "Demonstrates temporal reasoning and longitudinal analysis capabilities",
+        "tag": "Temporal analysis + Progression tracking",
+        "icon": "📈"
+    },
+    "🎯 Precision Medicine Query": {
+        "query": "For patients over 65 with heart conditions, what are the medication dosage patterns and how do they differ from younger patients?",
+        "description": "Showcases demographic filtering and precision medicine insights",
+        "tag": "Demographic analysis + Precision insights",
+        "icon": "🎯"
+    },
+    "🔬 Diagnostic Differential Analysis": {
+        "query": "When patients present with chest pain and shortness of breath, what diagnostic tests are ordered and what conditions are ultimately diagnosed?",
+        "description": "Highlights clinical reasoning and differential diagnosis support",
+        "tag": "Clinical reasoning + Diagnostics",
+        "icon": "🔬"
+    }
+}
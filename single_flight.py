@@ -0,0 +1,46 @@
+import asyncio
+
+from instrumentation import inc
+
+
+class AsyncSingleFlight:
+    """Coalesce identical in-flight coroutines into one shared task
+
+    The first caller for a key starts the work; callers that arrive while it is
+    running await the same task and receive the same result (or exception). A
+    caller that is cancelled only stops waiting; the shared work is cancelled
+    once every waiter has gone. Must be used from a single event loop.
+    """
+
+    def __init__(self, name='default'):
+        self.name = name
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, coro_factory):
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(coro_factory())
+            entry = self._inflight[key] = {'task': task, 'waiters': 0}
+            task.add_done_callback(lambda _t: self._forget(key, entry))
+            inc('rag_singleflight_total', flight=self.name, role='leader')
+        else:
+            inc('rag_singleflight_total', flight=self.name, role='follower')
+
+        entry['waiters'] += 1
+        try:
+            return await asyncio.shield(entry['task'])
+        except asyncio.CancelledError:
+            if entry['waiters'] == 1 and not entry['task'].done():
+                # Forget the dying task now so a caller arriving before it finishes starts a new flight
+                self._forget(key, entry)
+                entry['task'].cancel()
+            raise
+        finally:
+            entry['waiters'] -= 1
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
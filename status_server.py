@@ -0,0 +1,58 @@
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# path -> callable returning (status_code, content_type, body)
+ROUTES = {}
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def register_route(path, handler):
+    """Expose a handler on the status server at the given path"""
+    ROUTES[path] = handler
+
+
+def json_response(payload, status_code=200):
+    """Build a route result carrying a JSON body"""
+    return status_code, 'application/json', json.dumps(payload)
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        handler = ROUTES.get(self.path.split('?', 1)[0])
+        if handler is None:
+            status_code, content_type, body = json_response({'error': 'not found'}, 404)
+        else:
+            status_code, content_type, body = handler()
+
+        data = body.encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Probes hit these endpoints every few seconds; keep the console quiet
+        pass
+
+
+def start_status_server(port=None):
+    """Start the status HTTP server once per process (port from RAG_STATUS_PORT)"""
+    global _server
+
+    if port is None:
+        port = os.getenv("RAG_STATUS_PORT")
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(('0.0.0.0', int(port)), _StatusHandler)
+            thread = threading.Thread(target=_server.serve_forever, name='status-server', daemon=True)
+            thread.start()
+            print(f"🩺 Status server listening on port {port}")
+    return _server
@@ -0,0 +1,33 @@
+import pytest
+
+from rag_pipeline import select_adaptive
+
+THRESHOLDS = dict(min_relevance=0.4, window=0.08, min_gap=0.03)
+
+
+def docs(*similarities):
+    return [{'id': i, 'similarity': s} for i, s in enumerate(similarities)]
+
+
+@pytest.mark.parametrize('similarities, kept, reason, dropped', [
+    ((), 0, 'below_relevance_bar', {'relevance_bar': 0}),
+    ((0.30, 0.20), 0, 'below_relevance_bar', {'relevance_bar': 2}),
+    ((0.50, 0.49, 0.48), 3, 'all_relevant', {'relevance_bar': 0, 'score_window': 0, 'score_gap': 0}),
+    ((0.50, 0.49, 0.35), 2, 'relevance_bar', {'relevance_bar': 1, 'score_window': 0, 'score_gap': 0}),
+    ((0.60, 0.58, 0.56, 0.54, 0.51), 4, 'score_window', {'relevance_bar': 0, 'score_window': 1, 'score_gap': 0}),
+    ((0.70, 0.69, 0.65, 0.64), 2, 'score_gap', {'relevance_bar': 0, 'score_window': 0, 'score_gap': 2}),
+    ((0.70, 0.69, 0.65, 0.60, 0.35), 2, 'relevance_bar+score_window+score_gap',
+     {'relevance_bar': 1, 'score_window': 1, 'score_gap': 1}),
+])
+def test_select_adaptive(similarities, kept, reason, dropped):
+    retrieved = docs(*similarities)
+    selected, decision = select_adaptive(retrieved, **THRESHOLDS)
+
+    assert selected == retrieved[:kept]
+    assert decision['kept'] == kept
+    assert decision['candidates'] == len(retrieved)
+    assert decision['reason'] == reason
+    assert decision['dropped'] == dropped
+    assert decision['top_similarity'] == (similarities[0] if similarities else None)
+    if kept:
+        assert decision['cut_similarity'] == similarities[kept - 1]
@@ -0,0 +1,65 @@
+import gc
+import time
+import asyncio
+
+import numpy as np
+import pytest
+
+from async_pipeline import _run_pipeline
+
+
+class FakeRag:
+    index_version = 'v1'
+
+    def __init__(self, keyword_error=False):
+        self.keyword_error = keyword_error
+        self.encoded = []
+
+    def encode_query(self, query):
+        self.encoded.append(query)
+        return np.ones((1, 4), dtype='float32')
+
+    def search_by_embedding(self, q_emb, top_k=5):
+        return [{'rank': 1, 'doc_id': 0, 'document': 'record', 'similarity': 0.8}]
+
+    def keyword_search(self, query, top_k=5):
+        time.sleep(0.05)
+        if self.keyword_error:
+            raise RuntimeError("keyword index unavailable")
+        return []
+
+
+class FakeStore:
+    def __init__(self, hit):
+        self.hit = hit
+
+    def lookup(self, query, index_version, top_k, adaptive=False):
+        return ("stored answer", [], 'records') if self.hit else None
+
+
+class FailingModel:
+    def generate_content(self, prompt):
+        raise RuntimeError("429 Resource exhausted")
+
+
+def test_precomputed_hit_skips_dense_retrieval():
+    rag = FakeRag()
+    result = asyncio.run(_run_pipeline("chest pain", rag, None, 3, FakeStore(hit=True), False, None))
+    assert result['precomputed'] and result['answer'] == "stored answer"
+    assert rag.encoded == []
+
+
+def test_failed_generation_leaves_no_unretrieved_stage_errors():
+    rag = FakeRag(keyword_error=True)
+
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda _loop, ctx: errors.append(ctx))
+        with pytest.raises(RuntimeError, match="429"):
+            await _run_pipeline("chest pain", rag, FailingModel(), 3, FakeStore(hit=False), False, None)
+        await asyncio.sleep(0.1)
+        gc.collect()
+        return errors
+
+    assert asyncio.run(main()) == []
+    assert rag.encoded == ["chest pain"]
@@ -0,0 +1,12 @@
+import pytest
+
+from import_budget import DEFAULT_BUDGET, app_imports, measure
+
+# The probe imports the app's modules for real, so their light dependencies must be installed
+pytest.importorskip('dotenv')
+
+
+def test_app_imports_within_budget_and_without_heavy_modules():
+    seconds, heavy, _ = measure(app_imports())
+    assert heavy == []
+    assert seconds <= DEFAULT_BUDGET
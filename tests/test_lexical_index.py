@@ -0,0 +1,76 @@
+import math
+
+import pytest
+
+from lexical_index import InvertedIndex, tokenize, K1, B, EPSILON
+
+DOCUMENTS = [
+    "Patient with type 2 diabetes and hypertension, on metformin.",
+    "Congestive heart failure with reduced ejection fraction; patient on furosemide.",
+    "COPD exacerbation, patient treated with nebulised bronchodilators.",
+    "Patient reports chest pain and shortness of breath on exertion.",
+    "Routine visit, patient blood pressure well controlled on lisinopril.",
+    "Atrial fibrillation, patient started on apixaban; heart rate controlled.",
+    "Chronic kidney disease stage 3, patient monitored for hypertension.",
+]
+
+
+def brute_force_bm25(documents, query):
+    """Okapi BM25 scored document by document, as rank_bm25's BM25Okapi does"""
+    corpus = [tokenize(d) for d in documents]
+    n = len(corpus)
+    avgdl = sum(len(doc) for doc in corpus) / n
+    df = {}
+    for doc in corpus:
+        for term in set(doc):
+            df[term] = df.get(term, 0) + 1
+    idf = {t: math.log(n - f + 0.5) - math.log(f + 0.5) for t, f in df.items()}
+    floor = EPSILON * sum(idf.values()) / len(idf)
+    idf = {t: (floor if v < 0 else v) for t, v in idf.items()}
+
+    scores = []
+    for doc in corpus:
+        score = 0.0
+        for term in tokenize(query):
+            tf = doc.count(term)
+            if tf:
+                score += idf[term] * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(doc) / avgdl))
+        scores.append(score)
+    return scores
+
+
+@pytest.mark.parametrize('query', [
+    "hypertension medication",
+    "hypertension hypertension medication",   # repeated terms count per occurrence
+    "dm patients with chf",                   # abbreviations expand to stemmed words
+    "patient",                                # in every record: negative IDF floored
+    "htn ckd",
+])
+def test_search_matches_brute_force_bm25(query):
+    index = InvertedIndex.build(DOCUMENTS)
+    expected = brute_force_bm25(DOCUMENTS, query)
+    hits = index.search(query, top_k=len(DOCUMENTS))
+
+    assert hits, query
+    for doc_id, score in hits:
+        assert score == pytest.approx(expected[doc_id], rel=1e-5)
+    matching = {i for i, s in enumerate(expected) if s > 0}
+    assert {doc_id for doc_id, _ in hits} == matching
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+
+def test_abbreviations_tokenize_like_spelled_out_terms():
+    assert tokenize("dm chf copd bp") == tokenize(
+        "diabetes heart failure chronic obstructive pulmonary disease blood pressure")
+
+
+def test_save_load_round_trip(tmp_path):
+    index = InvertedIndex.build(DOCUMENTS, version='v1:tok')
+    index.save(str(tmp_path))
+    loaded = InvertedIndex.load(str(tmp_path))
+
+    assert loaded.version == 'v1:tok'
+    assert loaded.vocab == index.vocab
+    for query in ("hypertension medication", "afib", "sob chest pain"):
+        assert loaded.search(query, top_k=3) == index.search(query, top_k=3)
+    assert not [p for p in tmp_path.iterdir() if '.tmp.' in p.name]
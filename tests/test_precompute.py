@@ -0,0 +1,47 @@
+import precompute
+from precompute import PrecomputedStore
+
+
+class FakeRag:
+    index_version = 'v1'
+
+
+def fake_answers(calls):
+    def rag_answer_smart(query, rag, generation_model, top_k=3, adaptive=False):
+        calls.append(query)
+        return f"answer to {query}", [{'doc_id': 1, 'similarity': 0.7}], 'records'
+    return rag_answer_smart
+
+
+def test_lookup_requires_matching_settings(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(precompute, 'rag_answer_smart', fake_answers(calls))
+    store = PrecomputedStore(str(tmp_path / 'answers.json'))
+    store.refresh(['q one'], FakeRag(), None, top_k=3, adaptive=True)
+
+    assert store.lookup('q one', 'v1', 3, adaptive=True)[0] == "answer to q one"
+    assert store.lookup('q one', 'v1', 5, adaptive=True) is None
+    assert store.lookup('q one', 'v1', 3, adaptive=False) is None
+    assert store.lookup('q one', 'v2', 3, adaptive=True) is None
+
+
+def test_changed_relevance_bar_invalidates_adaptive_answers(tmp_path, monkeypatch):
+    monkeypatch.setattr(precompute, 'rag_answer_smart', fake_answers([]))
+    store = PrecomputedStore(str(tmp_path / 'answers.json'))
+    store.refresh(['q one'], FakeRag(), None, top_k=3, adaptive=True)
+
+    monkeypatch.setattr(precompute, 'ADAPTIVE_MIN_RELEVANCE', 0.55)
+    assert store.lookup('q one', 'v1', 3, adaptive=True) is None
+    assert store.missing_prompts(['q one'], 'v1', 3, adaptive=True) == ['q one']
+
+
+def test_second_worker_reuses_the_first_workers_refresh(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(precompute, 'rag_answer_smart', fake_answers(calls))
+    path = str(tmp_path / 'answers.json')
+    first, second = PrecomputedStore(path), PrecomputedStore(path)
+
+    assert first.refresh(['q one', 'q two'], FakeRag(), None, top_k=3, adaptive=True) == 2
+    assert second.refresh(['q one', 'q two'], FakeRag(), None, top_k=3, adaptive=True) == 0
+    assert calls == ['q one', 'q two']
+    assert second.lookup('q two', 'v1', 3, adaptive=True)[0] == "answer to q two"
@@ -0,0 +1,75 @@
+import os
+import time
+import pstats
+import asyncio
+import threading
+
+from instrumentation import span, active_trace_ids
+from async_pipeline import _in_span
+from profiling import profile_request, _rotate
+
+
+def busy_stage(seconds=0.1):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return 'done'
+
+
+def unrelated_work(stop):
+    while not stop.is_set():
+        busy_stage(0.01)
+
+
+def test_spans_held_across_awaits_do_not_bind_the_loop_thread():
+    async def request(name, delay):
+        with span(name):
+            await asyncio.sleep(delay)
+            bound = dict(active_trace_ids())
+            await asyncio.sleep(delay)
+        return bound
+
+    async def main():
+        return await asyncio.gather(request('a', 0.01), request('b', 0.015))
+
+    seen = asyncio.run(main())
+    loop_thread = threading.get_ident()
+    assert all(loop_thread not in bound for bound in seen)
+    assert loop_thread not in active_trace_ids()
+
+
+def test_profile_covers_stage_threads_only(tmp_path, monkeypatch):
+    monkeypatch.setenv('RAG_PROFILE_DIR', str(tmp_path))
+    stop = threading.Event()
+    noise = threading.Thread(target=unrelated_work, args=(stop,), name='other-session', daemon=True)
+    noise.start()
+    try:
+        with profile_request('query', enabled=True, profile_caller=False) as prefix:
+            result = asyncio.run(asyncio.to_thread(_in_span, 'stage', busy_stage, 0.2))
+    finally:
+        stop.set()
+        noise.join()
+
+    assert result == 'done'
+    stats = pstats.Stats(f"{prefix}.pstats")
+    assert any(func[2] == 'busy_stage' for func in stats.stats)
+    with open(f"{prefix}.folded", encoding='utf-8') as f:
+        folded = f.read()
+    assert 'busy_stage' in folded
+    assert 'other-session' not in folded
+    assert not active_trace_ids()
+
+
+def test_rotate_tolerates_files_removed_concurrently(tmp_path, monkeypatch):
+    for i in range(4):
+        (tmp_path / f"q-{i}.folded").write_text("x 1\n")
+    real_getmtime = os.path.getmtime
+
+    def vanishing_getmtime(path):
+        if path.endswith('q-0.folded'):
+            raise FileNotFoundError(path)
+        return real_getmtime(path)
+
+    monkeypatch.setattr(os.path, 'getmtime', vanishing_getmtime)
+    _rotate(str(tmp_path), keep=1)
+    assert len(os.listdir(tmp_path)) <= 3
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from session_context import ANAPHORA_COSINE, FOLLOW_UP_COSINE, ConversationSession
+
+PREVIOUS = np.array([[1.0, 0.0, 0.0]], dtype='float32')
+
+
+def at_cosine(cosine):
+    """Unit query embedding with the given cosine to PREVIOUS"""
+    return np.array([[cosine, np.sqrt(1 - cosine ** 2), 0.0]], dtype='float32')
+
+
+def source(doc_id):
+    return {'doc_id': doc_id}
+
+
+def session_after(q_emb=PREVIOUS, doc_ids=(1, 2), **kwargs):
+    session = ConversationSession(**kwargs)
+    session.record_turn("patients with hypertension", q_emb, "Several records mention it.",
+                        [source(d) for d in doc_ids])
+    return session
+
+
+class FakeRAG:
+    def __init__(self, q_emb, cached_similarity):
+        self.q_emb = q_emb
+        self.cached_similarity = cached_similarity
+        self.searched = []
+        self.scored = []
+
+    def encode_query(self, query):
+        return self.q_emb
+
+    def search_by_embedding(self, q_emb, top_k):
+        self.searched.append(q_emb)
+        return [{'doc_id': 99, 'similarity': 0.9}]
+
+    def score_documents(self, q_emb, doc_ids):
+        self.scored.append(list(doc_ids))
+        return [{'doc_id': d, 'similarity': self.cached_similarity} for d in doc_ids]
+
+
+def test_first_query_is_never_a_follow_up():
+    assert not ConversationSession().is_follow_up("what about their medications", PREVIOUS)
+
+
+def test_continuation_opener_is_a_follow_up_regardless_of_embedding():
+    assert session_after().is_follow_up("what about their medications", at_cosine(0.0))
+
+
+@pytest.mark.parametrize('cosine, expected', [
+    (ANAPHORA_COSINE - 0.05, False),
+    (ANAPHORA_COSINE + 0.05, True),
+])
+def test_pronoun_needs_anaphora_cosine(cosine, expected):
+    assert session_after().is_follow_up("what dose did they get", at_cosine(cosine)) is expected
+
+
+@pytest.mark.parametrize('cosine, expected', [
+    (FOLLOW_UP_COSINE - 0.05, False),
+    (FOLLOW_UP_COSINE + 0.05, True),
+])
+def test_plain_query_needs_follow_up_cosine(cosine, expected):
+    assert session_after().is_follow_up("any kidney complications recorded", at_cosine(cosine)) is expected
+
+
+def test_turn_without_embedding_only_continues_on_opener():
+    # Precomputed answers are recorded without encoding the query
+    session = session_after(q_emb=None)
+    assert session.turns[-1]['embedding'] is None
+    assert not session.is_follow_up("what dose did they get", at_cosine(1.0))
+    assert session.is_follow_up("what about their medications", at_cosine(1.0))
+    q_emb = at_cosine(0.2)
+    assert session.topic_embedding(q_emb) is q_emb
+
+
+def test_cached_doc_ids_newest_first_distinct_and_capped():
+    session = ConversationSession(max_turns=3, max_cached_docs=4)
+    for doc_ids in ([1, 2], [3, 2], [4, 5], [6]):
+        session.record_turn("q", PREVIOUS, "a", [source(d) for d in doc_ids] + [{'doc_id': None}])
+    # The first turn fell out of the window, so 1 is gone
+    assert session.cached_doc_ids() == [6, 4, 5, 3]
+
+
+def test_retrieve_new_topic_searches_with_query_embedding():
+    session = session_after()
+    q_emb = at_cosine(0.0)
+    rag = FakeRAG(q_emb, cached_similarity=0.9)
+    results, how, returned = session.retrieve(rag, "any kidney complications recorded", 5, 0.4)
+    assert how == 'new_topic'
+    assert rag.searched == [q_emb] and rag.scored == []
+    assert returned is q_emb and results[0]['doc_id'] == 99
+
+
+def test_retrieve_reuses_cached_documents_when_relevant():
+    session = session_after(doc_ids=(1, 2, 3))
+    rag = FakeRAG(at_cosine(0.0), cached_similarity=0.6)
+    results, how, _ = session.retrieve(rag, "what about their medications", 2, 0.4)
+    assert how == 'reused'
+    assert rag.scored == [[1, 2, 3]] and rag.searched == []
+    assert [r['doc_id'] for r in results] == [1, 2]
+
+
+def test_retrieve_searches_with_topic_embedding_when_cache_is_irrelevant():
+    session = session_after()
+    q_emb = at_cosine(0.0)
+    rag = FakeRAG(q_emb, cached_similarity=0.1)
+    _, how, _ = session.retrieve(rag, "what about their medications", 5, 0.4)
+    assert how == 'follow_up_search'
+    np.testing.assert_allclose(rag.searched[0], session.topic_embedding(q_emb))
+    np.testing.assert_allclose(np.linalg.norm(rag.searched[0]), 1.0, rtol=1e-5)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip('faiss')
+
+from sharded_index import build_sharded_index
+from shared_index import export_shared_bundle, load_shared_bundle, load_shared_shards
+
+DIM = 16
+
+
+def corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((n, DIM), dtype=np.float32)
+    documents = [f"record {i} {rng.integers(1_000_000)}" for i in range(n)]
+    return documents, vectors
+
+
+def flat_index(vectors):
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+    return index
+
+
+@pytest.mark.parametrize('num_shards', [2, 3, 7])
+def test_sharded_search_equals_flat_search(num_shards):
+    documents, vectors = corpus(300)
+    queries = np.random.default_rng(1).random((25, DIM), dtype=np.float32)
+    expected_d, expected_i = flat_index(vectors).search(queries, 10)
+
+    sharded = build_sharded_index(documents, vectors, num_shards)
+    distances, ids = sharded.search(queries, 10)
+
+    assert sharded.ntotal == len(vectors)
+    np.testing.assert_array_equal(ids, expected_i)
+    np.testing.assert_allclose(distances, expected_d, rtol=1e-5)
+
+
+def test_k_beyond_shard_and_corpus_size_pads_with_minus_one():
+    documents, vectors = corpus(10)
+    sharded = build_sharded_index(documents, vectors, 7)
+    assert min(shard.ntotal for shard in sharded.shards) < 4
+
+    distances, ids = sharded.search(vectors[:2], 12)
+    expected_d, expected_i = flat_index(vectors).search(vectors[:2], 10)
+
+    np.testing.assert_array_equal(ids[:, :10], expected_i)
+    np.testing.assert_allclose(distances[:, :10], expected_d, rtol=1e-5, atol=1e-6)
+    assert (ids[:, 10:] == -1).all()
+    assert np.isinf(distances[:, 10:]).all()
+
+
+def test_shared_bundle_shards(tmp_path):
+    documents, vectors = corpus(120)
+    index = flat_index(vectors)
+    export_shared_bundle(str(tmp_path), documents, vectors, index, 'v1', num_shards=3)
+    _, _, _, manifest = load_shared_bundle(str(tmp_path))
+
+    assert load_shared_shards(str(tmp_path), manifest, 4) is None
+
+    mapped = load_shared_shards(str(tmp_path), manifest, 3)
+    queries = vectors[:5]
+    np.testing.assert_array_equal(mapped.search(queries, 8)[1], index.search(queries, 8)[1])
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip('faiss')
+
+from shared_index import read_index_mmap
+
+
+def _anonymous_rss_kb():
+    # Private (anonymous) memory only; pages of a mapped file are shared and not counted
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1])
+    pytest.skip("RssAnon not available")
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/status'), reason="needs Linux /proc")
+def test_read_index_mmap_does_not_copy_flat_vectors(tmp_path):
+    vectors = np.random.default_rng(0).random((40000, 384), dtype=np.float32)  # ~61 MB
+    index = faiss.IndexFlatL2(384)
+    index.add(vectors)
+    path = str(tmp_path / 'index.faiss')
+    faiss.write_index(index, path)
+    expected = index.search(vectors[:3], 2)
+    del index
+
+    before = _anonymous_rss_kb()
+    mapped = read_index_mmap(path)
+    distances, ids = mapped.search(vectors[:3], 2)
+    grown_mb = (_anonymous_rss_kb() - before) / 1024
+
+    assert mapped.ntotal == len(vectors)
+    np.testing.assert_array_equal(ids, expected[1])
+    np.testing.assert_allclose(distances, expected[0])
+    assert grown_mb < 10, f"index was copied into private memory (+{grown_mb:.0f} MB)"
@@ -0,0 +1,45 @@
+import asyncio
+
+from single_flight import AsyncSingleFlight
+
+
+def test_followers_share_one_call():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'answer'
+
+    async def main():
+        flight = AsyncSingleFlight('test')
+        results = await asyncio.gather(*(flight.run('q', work) for _ in range(3)))
+        return results, len(flight)
+
+    results, inflight = asyncio.run(main())
+    assert results == ['answer'] * 3
+    assert calls == [1]
+    assert inflight == 0
+
+
+def test_join_after_last_waiter_cancelled_starts_new_flight():
+    started = []
+
+    async def work():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return len(started)
+
+    async def main():
+        flight = AsyncSingleFlight('test')
+        first = asyncio.ensure_future(flight.run('q', work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        # Same key right after the only waiter left, while the old task is still unwinding
+        second = await flight.run('q', work)
+        return first.cancelled(), second
+
+    first_cancelled, second = asyncio.run(main())
+    assert first_cancelled
+    assert second == 2
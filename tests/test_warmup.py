@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+import pytest
+
+import warmup
+
+
+class FakeModel:
+    def encode(self, texts):
+        return np.zeros((len(texts), 4), dtype='float32')
+
+
+class FakeRag:
+    def __init__(self, failures=0):
+        self.embeddings = np.zeros((8, 4), dtype='float32')
+        self.model = FakeModel()
+        self.failures = failures
+
+    def retrieve_with_scores(self, query, top_k=3):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("transient")
+        return []
+
+    def keyword_search(self, query, top_k=3):
+        return []
+
+
+class RateLimitedGemini:
+    def generate_content(self, prompt, generation_config=None):
+        raise RuntimeError("429 Resource exhausted")
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(warmup, '_ready', warmup.threading.Event())
+    monkeypatch.setattr(warmup, '_status', {
+        'ready': False, 'started_at': None, 'finished_at': None, 'duration': None,
+        'steps': {}, 'error': None, 'attempts': 0, 'generation_error': None
+    })
+    monkeypatch.setattr(warmup, '_warmup_thread', None)
+    monkeypatch.setattr(warmup, 'WARMUP_RETRY_BASE', 0.01)
+
+
+def test_failed_generation_ping_does_not_block_readiness():
+    status = warmup.warm_up(FakeRag(), ["q"], generation_model=RateLimitedGemini())
+    assert status['ready']
+    assert status['error'] is None
+    assert '429' in status['generation_error']
+
+
+def test_transient_failure_is_retried_until_ready():
+    warmup.start_warm_up(FakeRag(failures=2), ["q"]).join(timeout=5)
+    status = warmup.readiness_status()
+    assert status['ready']
+    assert status['attempts'] == 3
+    assert warmup.is_ready()
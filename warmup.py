@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from status_server import register_route, json_response
+
+PAGE_SIZE = 4096
+# Seconds between failed warm-up attempts, doubling up to the cap
+WARMUP_RETRY_BASE = 5.0
+WARMUP_RETRY_MAX = 300.0
+
+_ready = threading.Event()
+_status = {
+    'ready': False,
+    'started_at': None,
+    'finished_at': None,
+    'duration': None,
+    'steps': {},
+    'error': None,
+    'attempts': 0,
+    'generation_error': None
+}
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def is_ready():
+    """True once the warm-up routine has finished successfully"""
+    return _ready.is_set()
+
+
+def readiness_status():
+    """Snapshot of the warm-up progress for the UI and the readiness endpoint"""
+    status = dict(_status)
+    status['steps'] = dict(_status['steps'])
+    return status
+
+
+def prefault_pages(array):
+    """Touch one byte per memory page so mmap'd buffers are resident before the first query"""
+    flat = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+    return int(flat[::PAGE_SIZE].sum())
+
+
+def _timed_step(name, fn):
+    start = time.time()
+    result = fn()
+    _status['steps'][name] = round(time.time() - start, 4)
+    return result
+
+
+def warm_up(rag, prompts, generation_model=None, top_k=3, extra_steps=None):
+    """Exercise the encoder, FAISS index, BM25 and Gemini client with dummy work"""
+    _status['started_at'] = time.time()
+    _status['error'] = None
+    _status['attempts'] += 1
+    prompts = [p for p in prompts if p] or ["medical records warm-up"]
+
+    try:
+        # Pull embedding and index pages in before any search touches them
+        _timed_step('prefault', lambda: prefault_pages(rag.embeddings))
+
+        # First encode loads tokenizer tables and allocates the forward-pass buffers
+        _timed_step('encode_batch', lambda: rag.model.encode(prompts))
+
+        # Same single-query path as retrieve_with_scores; a flat index scan touches every vector
+        _timed_step('retrieve', lambda: [rag.retrieve_with_scores(p, top_k=top_k) for p in prompts])
+
+        _timed_step('bm25', lambda: [rag.keyword_search(p, top_k=top_k) for p in prompts])
+
+        if generation_model is not None:
+            # Opens the HTTPS connection and resolves credentials up front. Optional:
+            # a 429 or network blip here is recorded but does not hold back readiness
+            try:
+                _timed_step('generation', lambda: generation_model.generate_content(
+                    "Reply with the single word OK.",
+                    generation_config={'max_output_tokens': 5}
+                ))
+                _status['generation_error'] = None
+            except Exception as e:
+                _status['generation_error'] = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Gemini warm-up ping failed (still marking ready): {_status['generation_error']}")
+
+        for name, step in (extra_steps or {}).items():
+            _timed_step(name, step)
+    except Exception as e:
+        _status['error'] = f"{type(e).__name__}: {e}"
+        print(f"⚠️ Warm-up failed: {_status['error']}")
+        return readiness_status()
+
+    _status['finished_at'] = time.time()
+    _status['duration'] = round(_status['finished_at'] - _status['started_at'], 4)
+    _status['ready'] = True
+    _ready.set()
+    print(f"🔥 Warm-up complete in {_status['duration']:.2f}s")
+    return readiness_status()
+
+
+def _warm_up_until_ready(rag, prompts, generation_model, top_k, extra_steps):
+    # A transient failure must not leave /ready at 503 for the life of the process
+    delay = WARMUP_RETRY_BASE
+    while not warm_up(rag, prompts, generation_model, top_k, extra_steps)['ready']:
+        print(f"🔁 Retrying warm-up in {delay:.0f}s")
+        time.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX)
+
+
+def start_warm_up(rag, prompts, generation_model=None, top_k=3, extra_steps=None):
+    """Run warm_up on a background thread once per process, retrying with backoff until it succeeds"""
+    global _warmup_thread
+
+    with _warmup_lock:
+        if _warmup_thread is None or (not _warmup_thread.is_alive() and not is_ready()):
+            _warmup_thread = threading.Thread(
+                target=_warm_up_until_ready,
+                args=(rag, prompts, generation_model, top_k, extra_steps),
+                name='rag-warmup',
+                daemon=True
+            )
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def _load_backend():
+    # Imported here so the launcher can open the status port before torch/faiss load
+    from retrieval_system import get_rag_system
+    from api_config import configure_gemini
+    from precompute import PrecomputedStore
+    from showcase import SHOWCASE_PROMPTS
+
+    prompts = [p['query'] for p in SHOWCASE_PROMPTS.values()]
+    _status['error'] = None
+    try:
+        rag_system = get_rag_system()
+        generation_model = configure_gemini()
+    except Exception as e:
+        _status['error'] = f"{type(e).__name__}: {e}"
+        print(f"⚠️ Startup failed: {_status['error']}")
+        raise
+
+    start_warm_up(
+        rag_system, prompts,
+        generation_model=generation_model if warm_up_generation_enabled() else None
+    )
+    # Answers for showcase prompts, regenerated in the background when the index or prompts change
+    precomputed_store = PrecomputedStore()
+    # Built with the UI defaults (3 documents, adaptive on) so the showcase buttons hit it
+    precomputed_store.start_background_refresh(prompts, rag_system, generation_model, top_k=3, adaptive=True)
+    return rag_system, generation_model, precomputed_store
+
+
+def start_backend():
+    """Load the RAG system and Gemini, then warm up, on a background thread once per process
+
+    Returns a future of (rag_system, generation_model, precomputed_store). serve.py
+    calls this before Streamlit starts so warm-up does not wait for the first visitor.
+    A failed load (bad GEMINI_API_KEY, model download error) is retried on the next call.
+    """
+    global _backend
+
+    with _backend_lock:
+        if _backend is None or (_backend.done() and _backend.exception() is not None):
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rag-startup')
+            _backend = executor.submit(_load_backend)
+            executor.shutdown(wait=False)
+    return _backend
+
+
+def warm_up_generation_enabled():
+    """Gemini warm-up costs one tiny request per process; RAG_WARMUP_GENERATION=0 disables it"""
+    return os.getenv("RAG_WARMUP_GENERATION", "1") != "0"
+
+
+def _ready_route():
+    status = readiness_status()
+    return json_response(status, 200 if status['ready'] else 503)
+
+
+def _health_route():
+    return json_response({'alive': True})
+
+
+register_route('/ready', _ready_route)
+register_route('/health', _health_route)